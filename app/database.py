@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -11,8 +11,16 @@ load_dotenv()
 # Database URL - Using SQLite for local development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./nutrition_app.db")
 
-# Create engine
-engine = create_engine(DATABASE_URL)
+# Create engine; batched INSERTs use insertmanyvalues pages, and psycopg2 also batches UPDATE/DELETE executemany
+engine_options = {"insertmanyvalues_page_size": 1000}
+if DATABASE_URL.startswith(("postgresql://", "postgresql+psycopg2://")):
+    engine_options["executemany_mode"] = "values_plus_batch"
+# Pooled engines serve the request sessions plus the shared analyzer threads of the profile and challenge
+# builders, which each check out their own connection; in-memory SQLite uses a per-thread pool instead
+if DATABASE_URL not in ("sqlite://", "sqlite:///:memory:"):
+    engine_options["pool_size"] = int(os.getenv("DB_POOL_SIZE", "10"))
+    engine_options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+engine = create_engine(DATABASE_URL, **engine_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -77,6 +85,11 @@ class FoodItem(Base):
     tags = Column(Text)  # JSON string of tags
     created_at = Column(DateTime, default=datetime.utcnow)
     planned = Column(Boolean, default=False)  # Whether this was a planned meal
+    
+    # Recommendation candidates are filtered by cuisine, complexity and cost
+    __table_args__ = (
+        Index("ix_fooditem_cuisine_complexity_cost", "cuisine_type", "prep_complexity", "cost"),
+    )
 
 class MealPlan(Base):
     __tablename__ = "meal_plans"
@@ -109,12 +122,20 @@ class MealLog(Base):
     protein = Column(Float, default=0)
     carbs = Column(Float, default=0)
     fat = Column(Float, default=0)
+    fiber_g = Column(Float, default=0)  # Materialized from food item * quantity at log time
+    sodium_mg = Column(Float, default=0)
+    sugar_g = Column(Float, default=0)
     logged_at = Column(DateTime, default=datetime.utcnow)
     planned = Column(Boolean, default=False)  # Whether this was a planned meal
     
     # Relationships
     user = relationship("User", back_populates="meal_logs")
     food_item = relationship("FoodItem")
+    
+    # Analytics queries filter by user over a logged_at window
+    __table_args__ = (
+        Index("ix_meallog_user_logged", "user_id", "logged_at"),
+    )
 
 class Goal(Base):
     __tablename__ = "goals"
@@ -174,6 +195,10 @@ class FoodRating(Base):
     # Relationships
     user = relationship("User")
     food_item = relationship("FoodItem")
+    
+    __table_args__ = (
+        Index("ix_foodrating_user_created", "user_id", "created_at"),
+    )
 
 class UserPreference(Base):
     __tablename__ = "user_preferences"
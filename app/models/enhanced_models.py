@@ -2,7 +2,7 @@
 """
 Enhanced data models for better personalization and ML recommendations
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import json
@@ -58,6 +58,11 @@ class UserCookingPattern(Base):
     
     # Relationships
     user = relationship("User")
+    
+    # One cooking pattern per user (conflict target for onboarding upserts)
+    __table_args__ = (
+        Index("ix_ucp_user", "user_id", unique=True),
+    )
 
 class MealPlanAdherence(Base):
     """Track adherence to meal plans for better planning"""
@@ -97,6 +102,10 @@ class UserNutritionGoals(Base):
     
     # Relationships
     user = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_ung_user_active", "user_id", "is_active"),
+    )
 
 class FoodPreferenceLearning(Base):
     """Advanced food preference learning"""
@@ -106,8 +115,8 @@ class FoodPreferenceLearning(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     food_item_id = Column(Integer, ForeignKey("food_items.id"), nullable=False)
     preference_score = Column(Float, default=0.5)  # 0-1 score
-    context_preferences = Column(JSON)  # Preferences by meal type, time, etc.
-    seasonal_preferences = Column(JSON)  # Seasonal food preferences
+    context_preferences = Column(JSON)  # Legacy; counts now live in FoodPreferenceContextCounter
+    seasonal_preferences = Column(JSON)  # Legacy; counts now live in FoodPreferenceSeasonCounter
     mood_preferences = Column(JSON)  # Food preferences based on mood/weather
     last_interaction = Column(DateTime, default=datetime.utcnow)
     interaction_count = Column(Integer, default=0)
@@ -115,6 +124,41 @@ class FoodPreferenceLearning(Base):
     # Relationships
     user = relationship("User")
     food_item = relationship("FoodItem")
+    
+    # One learning record per user/food pair (conflict target for interaction upserts)
+    __table_args__ = (
+        Index("ix_fpl_user_food", "user_id", "food_item_id", unique=True),
+    )
+
+class FoodPreferenceContextCounter(Base):
+    """Interaction count per user/food pair and meal context (meal type + time of day)"""
+    __tablename__ = "food_preference_context_counters"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    food_item_id = Column(Integer, ForeignKey("food_items.id"), nullable=False)
+    context_key = Column(String, nullable=False)  # e.g. lunch_afternoon
+    count = Column(Integer, default=0)
+    
+    # One counter per user/food/context (conflict target for increment upserts)
+    __table_args__ = (
+        Index("ix_fpcc_user_food_context", "user_id", "food_item_id", "context_key", unique=True),
+    )
+
+class FoodPreferenceSeasonCounter(Base):
+    """Interaction count per user/food pair and season"""
+    __tablename__ = "food_preference_season_counters"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    food_item_id = Column(Integer, ForeignKey("food_items.id"), nullable=False)
+    season = Column(String, nullable=False)  # spring, summer, fall, winter
+    count = Column(Integer, default=0)
+    
+    # One counter per user/food/season (conflict target for increment upserts)
+    __table_args__ = (
+        Index("ix_fpsc_user_food_season", "user_id", "food_item_id", "season", unique=True),
+    )
 
 class ChatbotInteraction(Base):
     """Track chatbot interactions for better responses"""
@@ -132,6 +176,10 @@ class ChatbotInteraction(Base):
     
     # Relationships
     user = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_chatbot_user_created", "user_id", "created_at"),
+    )
 
 class SeasonalPreference(Base):
     """Track seasonal food preferences"""
@@ -147,6 +195,11 @@ class SeasonalPreference(Base):
     
     # Relationships
     user = relationship("User")
+    
+    # Looked up per user, and per user and current season
+    __table_args__ = (
+        Index("ix_seasonal_user_season", "user_id", "season"),
+    )
 
 class SocialCookingData(Base):
     """Track social aspects of cooking and eating"""
@@ -163,3 +216,8 @@ class SocialCookingData(Base):
     
     # Relationships
     user = relationship("User")
+    
+    # One social cooking profile per user (conflict target for onboarding upserts)
+    __table_args__ = (
+        Index("ix_scd_user", "user_id", unique=True),
+    )
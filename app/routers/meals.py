@@ -47,6 +47,9 @@ async def log_meal(
     protein = food_item.protein_g * meal_log.quantity
     carbs = food_item.carbs_g * meal_log.quantity
     fat = food_item.fat_g * meal_log.quantity
+    fiber = (food_item.fiber_g or 0) * meal_log.quantity
+    sodium = (food_item.sodium_mg or 0) * meal_log.quantity
+    sugar = (food_item.sugar_g or 0) * meal_log.quantity
     
     # Create meal log entry
     meal_log_entry = MealLog(
@@ -57,7 +60,10 @@ async def log_meal(
         calories=calories,
         protein=protein,
         carbs=carbs,
-        fat=fat
+        fat=fat,
+        fiber_g=fiber,
+        sodium_mg=sodium,
+        sugar_g=sugar
     )
     
     db.add(meal_log_entry)
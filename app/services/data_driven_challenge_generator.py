@@ -4,11 +4,13 @@ Data-driven challenge generator that creates personalized challenges based on us
 """
 import json
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Iterable
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import and_, func, desc, select
 import statistics
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 
 from app.database import User, FoodItem, MealLog, FoodRating, Goal
 from app.models.enhanced_challenge_models import (
@@ -18,6 +20,190 @@ from app.models.enhanced_challenge_models import (
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per batch when streaming meal-log scans
+MEAL_SCAN_BATCH_SIZE = 1000
+
+# Worker threads that run the meal-log scans concurrently. The executor is shared by every
+# request, so the scans hold at most this many extra pooled connections per process
+ANALYSIS_WORKERS = 3
+_analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="challenge-analysis")
+
+# Challenge templates keyed by recommendation type. The templates are immutable and shared:
+# "fields" holds the constant part of the generated challenge, which is overlaid per call with
+# the user-dependent fields. "metric" is the path into the user analysis for the current level;
+# "target_rule" is (rule, limit, factor) where "scale" targets max(limit, current * factor),
+# "step" targets min(limit, current + factor) and "fixed" targets limit. A non-zero
+# "target_scale" converts the target to an int count.
+CHALLENGE_TEMPLATES = MappingProxyType({
+    "protein": MappingProxyType({
+        "fields": MappingProxyType({
+            "challenge_type": ChallengeType.NUTRITION,
+            "difficulty": ChallengeDifficulty.MEDIUM,
+            "title": "Protein Power Week",
+            "unit": "grams",
+            "duration_days": 7,
+            "target_improvement": 20,
+            "points_reward": 150,
+            "badge_reward": "protein_power"
+        }),
+        "description": "Increase your daily protein intake to {target_value:.0f}g per day",
+        "metric": ("nutrition", "average_daily", "protein"),
+        "target_rule": ("scale", 120, 1.2),  # 20% increase
+        "target_scale": 0,
+        "baseline_key": "current_protein",
+        "based_on": "low_protein_intake",
+        "motivational_messages": (
+            "Protein helps build and repair muscles!",
+            "You're getting stronger with every gram!",
+            "Your body will thank you for the protein boost!"
+        )
+    }),
+    "fiber": MappingProxyType({
+        "fields": MappingProxyType({
+            "challenge_type": ChallengeType.NUTRITION,
+            "difficulty": ChallengeDifficulty.EASY,
+            "title": "Fiber Fuel Challenge",
+            "unit": "grams",
+            "duration_days": 7,
+            "target_improvement": 30,
+            "points_reward": 100,
+            "badge_reward": "fiber_champion"
+        }),
+        "description": "Boost your daily fiber intake to {target_value:.0f}g per day",
+        "metric": ("nutrition", "average_daily", "fiber"),
+        "target_rule": ("scale", 30, 1.3),  # 30% increase
+        "target_scale": 0,
+        "baseline_key": "current_fiber",
+        "based_on": "low_fiber_intake",
+        "motivational_messages": (
+            "Fiber keeps your digestive system happy!",
+            "More fiber = more energy throughout the day!",
+            "Your gut health is improving with every gram!"
+        )
+    }),
+    "meal_consistency": MappingProxyType({
+        "fields": MappingProxyType({
+            "challenge_type": ChallengeType.CONSISTENCY,
+            "difficulty": ChallengeDifficulty.MEDIUM,
+            "title": "Daily Logging Streak",
+            "unit": "percentage",
+            "duration_days": 7,
+            "target_improvement": 20,
+            "points_reward": 120,
+            "badge_reward": "consistency_king"
+        }),
+        "description": "Log meals {target_value:.0%} of days this week",
+        "metric": ("consistency", "daily_consistency"),
+        "target_rule": ("step", 0.9, 0.2),  # 20% improvement
+        "target_scale": 0,
+        "baseline_key": "current_consistency",
+        "based_on": "inconsistent_meal_logging",
+        "motivational_messages": (
+            "Consistency is the key to success!",
+            "Every logged meal brings you closer to your goals!",
+            "You're building a healthy habit!"
+        )
+    }),
+    "daily_logging": MappingProxyType({
+        "fields": MappingProxyType({
+            "challenge_type": ChallengeType.CONSISTENCY,
+            "difficulty": ChallengeDifficulty.EASY,
+            "title": "7-Day Logging Streak",
+            "unit": "days",
+            "duration_days": 7,
+            "target_improvement": 100,
+            "points_reward": 100,
+            "badge_reward": "streak_starter"
+        }),
+        "description": "Log at least one meal every day for 7 days",
+        "metric": (),
+        "target_rule": ("fixed", 7, None),
+        "target_scale": 0,
+        "baseline_key": "current_streak",
+        "based_on": "low_daily_consistency",
+        "motivational_messages": (
+            "Start your logging streak today!",
+            "One meal at a time, one day at a time!",
+            "You're building a powerful habit!"
+        )
+    }),
+    "variety": MappingProxyType({
+        "fields": MappingProxyType({
+            "challenge_type": ChallengeType.VARIETY,
+            "difficulty": ChallengeDifficulty.MEDIUM,
+            "title": "Food Explorer Challenge",
+            "unit": "unique_foods",
+            "duration_days": 7,
+            "target_improvement": 20,
+            "points_reward": 130,
+            "badge_reward": "food_explorer"
+        }),
+        "description": "Try {target_value} different foods this week",
+        "metric": ("behavioral", "variety_score"),
+        "target_rule": ("step", 0.8, 0.2),  # 20% improvement
+        "target_scale": 10,
+        "baseline_key": "current_variety",
+        "based_on": "low_food_variety",
+        "motivational_messages": (
+            "Discover new flavors and nutrients!",
+            "Variety is the spice of life!",
+            "Your taste buds will thank you!"
+        )
+    }),
+    "goal": MappingProxyType({
+        "fields": MappingProxyType({
+            "challenge_type": ChallengeType.GOAL_ORIENTED,
+            "difficulty": ChallengeDifficulty.HARD,
+            "duration_days": 7,
+            "target_improvement": 100,
+            "points_reward": 200
+        }),
+        "motivational_messages": (
+            "You're working toward your {goal_type} goal!",
+            "Every day counts toward your success!",
+            "You're closer to your goal than you think!"
+        )
+    })
+})
+
+# Per-goal-type fields for the "goal" challenge template
+GOAL_CHALLENGE_TEMPLATES = MappingProxyType({
+    "weight_loss": MappingProxyType({
+        "title": "Calorie Control Week",
+        "description": "Stay within your calorie target for 7 days",
+        "target_value": 7,
+        "unit": "days"
+    }),
+    "muscle_gain": MappingProxyType({
+        "title": "Protein Power Week",
+        "description": "Hit your protein target for 7 days",
+        "target_value": 7,
+        "unit": "days"
+    }),
+    "maintenance": MappingProxyType({
+        "title": "Balance Master Week",
+        "description": "Maintain balanced nutrition for 7 days",
+        "target_value": 7,
+        "unit": "days"
+    })
+})
+
+def _mean_std(values: Iterable[float]) -> Tuple[float, float]:
+    """Single-pass (Welford) mean and sample standard deviation; safe for 0 or 1 values"""
+    
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for value in values:
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+    
+    if count < 2:
+        return mean, 0.0
+    return mean, (m2 / (count - 1)) ** 0.5
+
 class DataDrivenChallengeGenerator:
     """Generate personalized challenges based on user data analysis"""
     
@@ -192,89 +378,126 @@ class DataDrivenChallengeGenerator:
         # Get user's recent data (last 30 days)
         cutoff_date = datetime.utcnow() - timedelta(days=30)
         
-        # Nutrition analysis
-        nutrition_analysis = self._analyze_nutrition_patterns(user_id, cutoff_date)
-        
-        # Workout analysis
-        workout_analysis = self._analyze_workout_patterns(user_id, cutoff_date)
+        # Cold-start users have nothing logged: skip the meal-based analyses and use defaults
+        data_quality_score = self._calculate_data_quality_score(user_id, cutoff_date)
+        if data_quality_score < 0.01:
+            return {
+                "nutrition": self._get_default_nutrition_analysis(),
+                "workout": self._analyze_workout_patterns(user_id, cutoff_date),
+                "consistency": self._get_default_consistency_analysis(),
+                "goals": self._analyze_goal_progress(user_id),
+                "behavioral": self._get_default_behavioral_analysis(),
+                "analysis_period_days": 30,
+                "data_quality_score": data_quality_score
+            }
         
-        # Consistency analysis
-        consistency_analysis = self._analyze_consistency_patterns(user_id, cutoff_date)
+        # The meal-log scans are independent and each waits on its own query, so run them
+        # concurrently; every worker gets its own session since sessions are not thread-safe
+        analyses = {
+            "nutrition": ("_analyze_nutrition_patterns", (user_id, cutoff_date)),
+            "consistency": ("_analyze_consistency_patterns", (user_id, cutoff_date)),
+            "behavioral": ("_analyze_behavioral_patterns", (user_id, cutoff_date))
+        }
+        session_factory = sessionmaker(bind=self.db.get_bind(), autoflush=False)
+        futures = {
+            key: _analysis_executor.submit(self._run_analysis, session_factory, method_name, args)
+            for key, (method_name, args) in analyses.items()
+        }
         
-        # Goal progress analysis
-        goal_analysis = self._analyze_goal_progress(user_id)
+        # The workout placeholder and the single goals query are cheap, so keep them on this session
+        workout = self._analyze_workout_patterns(user_id, cutoff_date)
+        goals = self._analyze_goal_progress(user_id)
         
-        # Behavioral patterns
-        behavioral_analysis = self._analyze_behavioral_patterns(user_id, cutoff_date)
+        results = {key: future.result() for key, future in futures.items()}
         
         return {
-            "nutrition": nutrition_analysis,
-            "workout": workout_analysis,
-            "consistency": consistency_analysis,
-            "goals": goal_analysis,
-            "behavioral": behavioral_analysis,
+            "nutrition": results["nutrition"],
+            "workout": workout,
+            "consistency": results["consistency"],
+            "goals": goals,
+            "behavioral": results["behavioral"],
             "analysis_period_days": 30,
-            "data_quality_score": self._calculate_data_quality_score(user_id, cutoff_date)
+            "data_quality_score": data_quality_score
         }
     
+    @staticmethod
+    def _run_analysis(session_factory: sessionmaker, method_name: str, args: Tuple) -> Dict[str, Any]:
+        """Run one analysis method on a worker thread with a dedicated session"""
+        
+        session = session_factory()
+        try:
+            return getattr(DataDrivenChallengeGenerator(session), method_name)(*args)
+        finally:
+            session.close()
+    
     def _analyze_nutrition_patterns(self, user_id: int, cutoff_date: datetime) -> Dict[str, Any]:
         """Analyze user's nutrition patterns"""
         
-        meals = self.db.query(MealLog).join(FoodItem).filter(
+        # Fiber/sodium/sugar are materialized on MealLog at log time, so no FoodItem join is needed;
+        # stream plain column tuples rather than materializing ORM objects
+        stmt = select(
+            MealLog.logged_at, MealLog.calories, MealLog.protein, MealLog.carbs, MealLog.fat,
+            MealLog.fiber_g, MealLog.sodium_mg, MealLog.sugar_g
+        ).where(
             and_(
                 MealLog.user_id == user_id,
                 MealLog.logged_at >= cutoff_date
             )
-        ).all()
-        
-        if not meals:
-            return self._get_default_nutrition_analysis()
+        ).order_by(MealLog.logged_at).execution_options(yield_per=MEAL_SCAN_BATCH_SIZE)
         
-        # Daily nutrition aggregation
+        # Daily nutrition aggregation (chronological, so trends read oldest to newest)
         daily_nutrition = {}
-        for meal in meals:
-            date = meal.logged_at.date()
-            if date not in daily_nutrition:
-                daily_nutrition[date] = {
+        total_meals = 0
+        for meal in self.db.execute(stmt):
+            total_meals += 1
+            # Key days by proleptic ordinal: an int hashes cheaper than a date object
+            date_key = meal.logged_at.toordinal()
+            day = daily_nutrition.get(date_key)
+            if day is None:
+                day = daily_nutrition[date_key] = {
                     'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0,
                     'fiber': 0, 'sodium': 0, 'sugar': 0, 'meal_count': 0
                 }
             
-            daily_nutrition[date]['calories'] += meal.calories
-            daily_nutrition[date]['protein'] += meal.protein
-            daily_nutrition[date]['carbs'] += meal.carbs
-            daily_nutrition[date]['fat'] += meal.fat
-            daily_nutrition[date]['fiber'] += meal.food_item.fiber_g * meal.quantity
-            daily_nutrition[date]['sodium'] += meal.food_item.sodium_mg * meal.quantity
-            daily_nutrition[date]['sugar'] += meal.food_item.sugar_g * meal.quantity
-            daily_nutrition[date]['meal_count'] += 1
+            day['calories'] += meal.calories
+            day['protein'] += meal.protein
+            day['carbs'] += meal.carbs
+            day['fat'] += meal.fat
+            day['fiber'] += meal.fiber_g or 0
+            day['sodium'] += meal.sodium_mg or 0
+            day['sugar'] += meal.sugar_g or 0
+            day['meal_count'] += 1
+        
+        if not total_meals:
+            return self._get_default_nutrition_analysis()
         
         # Calculate averages and patterns
         nutrition_values = list(daily_nutrition.values())
         
         avg_daily = {
-            'calories': statistics.mean([d['calories'] for d in nutrition_values]),
-            'protein': statistics.mean([d['protein'] for d in nutrition_values]),
-            'carbs': statistics.mean([d['carbs'] for d in nutrition_values]),
-            'fat': statistics.mean([d['fat'] for d in nutrition_values]),
-            'fiber': statistics.mean([d['fiber'] for d in nutrition_values]),
-            'sodium': statistics.mean([d['sodium'] for d in nutrition_values]),
-            'sugar': statistics.mean([d['sugar'] for d in nutrition_values]),
-            'meal_count': statistics.mean([d['meal_count'] for d in nutrition_values])
+            'calories': statistics.fmean([d['calories'] for d in nutrition_values]),
+            'protein': statistics.fmean([d['protein'] for d in nutrition_values]),
+            'carbs': statistics.fmean([d['carbs'] for d in nutrition_values]),
+            'fat': statistics.fmean([d['fat'] for d in nutrition_values]),
+            'fiber': statistics.fmean([d['fiber'] for d in nutrition_values]),
+            'sodium': statistics.fmean([d['sodium'] for d in nutrition_values]),
+            'sugar': statistics.fmean([d['sugar'] for d in nutrition_values]),
+            'meal_count': statistics.fmean([d['meal_count'] for d in nutrition_values])
         }
         
-        # Calculate consistency (with data validation)
-        calorie_values = [d['calories'] for d in nutrition_values]
-        meal_count_values = [d['meal_count'] for d in nutrition_values]
+        # Calculate consistency (with data validation); the sample stdev is kept
+        # deliberately since the logged days are a sample of the user's habits
+        calorie_mean, calorie_std = _mean_std(d['calories'] for d in nutrition_values)
+        meal_count_mean, meal_count_std = _mean_std(d['meal_count'] for d in nutrition_values)
         
         calorie_consistency = 0
         meal_consistency = 0
         
-        if len(calorie_values) >= 2 and avg_daily['calories'] > 0:
-            calorie_consistency = 1 - (statistics.stdev(calorie_values) / avg_daily['calories'])
+        if len(nutrition_values) >= 2 and calorie_mean > 0:
+            calorie_consistency = 1 - (calorie_std / calorie_mean)
         
-        if len(meal_count_values) >= 2 and avg_daily['meal_count'] > 0:
-            meal_consistency = 1 - (statistics.stdev(meal_count_values) / avg_daily['meal_count'])
+        if len(nutrition_values) >= 2 and meal_count_mean > 0:
+            meal_consistency = 1 - (meal_count_std / meal_count_mean)
         
         # Analyze trends
         calorie_trend = self._calculate_trend([d['calories'] for d in nutrition_values])
@@ -308,7 +531,7 @@ class DataDrivenChallengeGenerator:
             "weaknesses": weaknesses,
             "strengths": self._identify_nutrition_strengths(avg_daily, calorie_consistency, meal_consistency),
             "total_days_analyzed": len(daily_nutrition),
-            "total_meals": len(meals)
+            "total_meals": total_meals
         }
     
     def _analyze_workout_patterns(self, user_id: int, cutoff_date: datetime) -> Dict[str, Any]:
@@ -336,43 +559,50 @@ class DataDrivenChallengeGenerator:
     def _analyze_consistency_patterns(self, user_id: int, cutoff_date: datetime) -> Dict[str, Any]:
         """Analyze user's consistency patterns"""
         
-        meals = self.db.query(MealLog).filter(
+        stmt = select(MealLog.logged_at).where(
             and_(
                 MealLog.user_id == user_id,
                 MealLog.logged_at >= cutoff_date
             )
-        ).all()
-        
-        if not meals:
-            return self._get_default_consistency_analysis()
+        ).execution_options(yield_per=MEAL_SCAN_BATCH_SIZE)
         
-        # Analyze daily consistency
+        # Analyze daily consistency and bucket meal hours in a single pass
         daily_meal_counts = {}
-        for meal in meals:
-            date = meal.logged_at.date()
-            daily_meal_counts[date] = daily_meal_counts.get(date, 0) + 1
+        breakfast_times = []
+        lunch_times = []
+        dinner_times = []
+        for (logged_at,) in self.db.execute(stmt):
+            date_key = logged_at.toordinal()
+            daily_meal_counts[date_key] = daily_meal_counts.get(date_key, 0) + 1
+            
+            hour = logged_at.hour
+            if 6 <= hour <= 10:
+                breakfast_times.append(hour)
+            elif 11 <= hour <= 14:
+                lunch_times.append(hour)
+            elif 17 <= hour <= 21:
+                dinner_times.append(hour)
+        
+        if not daily_meal_counts:
+            return self._get_default_consistency_analysis()
         
         # Calculate consistency metrics
+        # Every tracked day has at least one meal, so each key is a day with meals
         total_days = len(daily_meal_counts)
-        days_with_meals = len([d for d in daily_meal_counts.values() if d > 0])
-        consistency_rate = days_with_meals / total_days if total_days > 0 else 0
+        days_with_meals = total_days
+        consistency_rate = days_with_meals / total_days
         
         # Analyze meal timing consistency
-        meal_times = [meal.logged_at.hour for meal in meals]
-        breakfast_times = [h for h in meal_times if 6 <= h <= 10]
-        lunch_times = [h for h in meal_times if 11 <= h <= 14]
-        dinner_times = [h for h in meal_times if 17 <= h <= 21]
-        
         timing_consistency = {
-            "breakfast": 1 - (statistics.stdev(breakfast_times) / 24) if len(breakfast_times) >= 2 else 0,
-            "lunch": 1 - (statistics.stdev(lunch_times) / 24) if len(lunch_times) >= 2 else 0,
-            "dinner": 1 - (statistics.stdev(dinner_times) / 24) if len(dinner_times) >= 2 else 0
+            "breakfast": 1 - (_mean_std(breakfast_times)[1] / 24) if len(breakfast_times) >= 2 else 0,
+            "lunch": 1 - (_mean_std(lunch_times)[1] / 24) if len(lunch_times) >= 2 else 0,
+            "dinner": 1 - (_mean_std(dinner_times)[1] / 24) if len(dinner_times) >= 2 else 0
         }
         
         return {
             "daily_consistency": consistency_rate,
             "timing_consistency": timing_consistency,
-            "average_meals_per_day": statistics.mean(daily_meal_counts.values()) if daily_meal_counts else 0,
+            "average_meals_per_day": statistics.fmean(daily_meal_counts.values()) if daily_meal_counts else 0,
             "total_days_logged": total_days,
             "weaknesses": self._identify_consistency_weaknesses(consistency_rate, timing_consistency),
             "strengths": self._identify_consistency_strengths(consistency_rate, timing_consistency)
@@ -411,30 +641,31 @@ class DataDrivenChallengeGenerator:
     def _analyze_behavioral_patterns(self, user_id: int, cutoff_date: datetime) -> Dict[str, Any]:
         """Analyze user's behavioral patterns"""
         
-        meals = self.db.query(MealLog).join(FoodItem).filter(
+        stmt = select(MealLog.food_item_id, MealLog.planned, FoodItem.cuisine_type).join(FoodItem).where(
             and_(
                 MealLog.user_id == user_id,
                 MealLog.logged_at >= cutoff_date
             )
-        ).all()
-        
-        if not meals:
-            return self._get_default_behavioral_analysis()
-        
-        # Analyze variety
-        unique_foods = len(set(meal.food_item_id for meal in meals))
-        variety_score = unique_foods / len(meals) if meals else 0
+        ).execution_options(yield_per=MEAL_SCAN_BATCH_SIZE)
         
-        # Analyze cuisine preferences
+        # Tally variety, cuisine preferences and meal planning in one pass
+        total_meals = 0
+        unique_foods = set()
         cuisine_counts = {}
-        for meal in meals:
-            if meal.food_item and meal.food_item.cuisine_type:
-                cuisine = meal.food_item.cuisine_type
+        planned_meals = 0
+        for food_item_id, planned, cuisine in self.db.execute(stmt):
+            total_meals += 1
+            unique_foods.add(food_item_id)
+            if cuisine:
                 cuisine_counts[cuisine] = cuisine_counts.get(cuisine, 0) + 1
+            if planned:
+                planned_meals += 1
         
-        # Analyze meal planning
-        planned_meals = len([meal for meal in meals if meal.planned])
-        planning_rate = planned_meals / len(meals) if meals else 0
+        if not total_meals:
+            return self._get_default_behavioral_analysis()
+        
+        variety_score = len(unique_foods) / total_meals
+        planning_rate = planned_meals / total_meals
         
         return {
             "variety_score": variety_score,
@@ -452,224 +683,77 @@ class DataDrivenChallengeGenerator:
         # Nutrition-based challenges
         nutrition_weaknesses = user_analysis["nutrition"]["weaknesses"]
         if "low_protein" in nutrition_weaknesses:
-            recommendations.append(self._create_protein_challenge(user_analysis))
+            recommendations.append(self._create_challenge("protein", user_analysis))
         if "low_fiber" in nutrition_weaknesses:
-            recommendations.append(self._create_fiber_challenge(user_analysis))
+            recommendations.append(self._create_challenge("fiber", user_analysis))
         if "inconsistent_meals" in nutrition_weaknesses:
-            recommendations.append(self._create_meal_consistency_challenge(user_analysis))
+            recommendations.append(self._create_challenge("meal_consistency", user_analysis))
         
         # Consistency-based challenges
         consistency_weaknesses = user_analysis["consistency"]["weaknesses"]
         if "daily_consistency" in consistency_weaknesses:
-            recommendations.append(self._create_daily_logging_challenge(user_analysis))
+            recommendations.append(self._create_challenge("daily_logging", user_analysis))
         
         # Variety-based challenges
         behavioral_weaknesses = user_analysis["behavioral"]["weaknesses"]
         if "low_variety" in behavioral_weaknesses:
-            recommendations.append(self._create_variety_challenge(user_analysis))
+            recommendations.append(self._create_challenge("variety", user_analysis))
         
         # Goal-oriented challenges
         goal_weaknesses = user_analysis["goals"]["weaknesses"]
         for goal_type in goal_weaknesses:
-            recommendations.append(self._create_goal_challenge(user_analysis, goal_type))
+            recommendations.append(self._create_challenge("goal", user_analysis, goal_type=goal_type))
         
         return recommendations
     
-    def _create_protein_challenge(self, user_analysis: Dict) -> Dict[str, Any]:
-        """Create a protein-focused challenge"""
-        
-        current_protein = user_analysis["nutrition"]["average_daily"]["protein"]
-        target_protein = max(120, current_protein * 1.2)  # 20% increase
-        
-        return {
-            "challenge_type": ChallengeType.NUTRITION,
-            "difficulty": ChallengeDifficulty.MEDIUM,
-            "title": "Protein Power Week",
-            "description": f"Increase your daily protein intake to {target_protein:.0f}g per day",
-            "target_value": target_protein,
-            "unit": "grams",
-            "duration_days": 7,
-            "baseline_data": {"current_protein": current_protein},
-            "target_improvement": 20,
-            "personalization_factors": {
-                "based_on": "low_protein_intake",
-                "current_level": current_protein,
-                "improvement_needed": target_protein - current_protein
-            },
-            "points_reward": 150,
-            "badge_reward": "protein_power",
-            "motivational_messages": [
-                "Protein helps build and repair muscles!",
-                "You're getting stronger with every gram!",
-                "Your body will thank you for the protein boost!"
-            ]
-        }
-    
-    def _create_fiber_challenge(self, user_analysis: Dict) -> Dict[str, Any]:
-        """Create a fiber-focused challenge"""
+    def _create_challenge(self, template_key: str, user_analysis: Dict, goal_type: Optional[str] = None) -> Dict[str, Any]:
+        """Create a challenge from a CHALLENGE_TEMPLATES entry personalized to the user's analysis"""
         
-        current_fiber = user_analysis["nutrition"]["average_daily"]["fiber"]
-        target_fiber = max(30, current_fiber * 1.3)  # 30% increase
+        template = CHALLENGE_TEMPLATES[template_key]
         
-        return {
-            "challenge_type": ChallengeType.NUTRITION,
-            "difficulty": ChallengeDifficulty.EASY,
-            "title": "Fiber Fuel Challenge",
-            "description": f"Boost your daily fiber intake to {target_fiber:.0f}g per day",
-            "target_value": target_fiber,
-            "unit": "grams",
-            "duration_days": 7,
-            "baseline_data": {"current_fiber": current_fiber},
-            "target_improvement": 30,
-            "personalization_factors": {
-                "based_on": "low_fiber_intake",
-                "current_level": current_fiber,
-                "improvement_needed": target_fiber - current_fiber
-            },
-            "points_reward": 100,
-            "badge_reward": "fiber_champion",
-            "motivational_messages": [
-                "Fiber keeps your digestive system happy!",
-                "More fiber = more energy throughout the day!",
-                "Your gut health is improving with every gram!"
-            ]
-        }
-    
-    def _create_meal_consistency_challenge(self, user_analysis: Dict) -> Dict[str, Any]:
-        """Create a meal consistency challenge"""
-        
-        current_consistency = user_analysis["consistency"]["daily_consistency"]
-        target_consistency = min(0.9, current_consistency + 0.2)  # 20% improvement
-        
-        return {
-            "challenge_type": ChallengeType.CONSISTENCY,
-            "difficulty": ChallengeDifficulty.MEDIUM,
-            "title": "Daily Logging Streak",
-            "description": f"Log meals {target_consistency*100:.0f}% of days this week",
-            "target_value": target_consistency,
-            "unit": "percentage",
-            "duration_days": 7,
-            "baseline_data": {"current_consistency": current_consistency},
-            "target_improvement": 20,
-            "personalization_factors": {
-                "based_on": "inconsistent_meal_logging",
-                "current_level": current_consistency,
-                "improvement_needed": target_consistency - current_consistency
-            },
-            "points_reward": 120,
-            "badge_reward": "consistency_king",
-            "motivational_messages": [
-                "Consistency is the key to success!",
-                "Every logged meal brings you closer to your goals!",
-                "You're building a healthy habit!"
-            ]
-        }
-    
-    def _create_daily_logging_challenge(self, user_analysis: Dict) -> Dict[str, Any]:
-        """Create a daily logging challenge"""
-        
-        return {
-            "challenge_type": ChallengeType.CONSISTENCY,
-            "difficulty": ChallengeDifficulty.EASY,
-            "title": "7-Day Logging Streak",
-            "description": "Log at least one meal every day for 7 days",
-            "target_value": 7,
-            "unit": "days",
-            "duration_days": 7,
-            "baseline_data": {"current_streak": 0},
-            "target_improvement": 100,
-            "personalization_factors": {
-                "based_on": "low_daily_consistency",
-                "current_level": 0,
-                "improvement_needed": 7
-            },
-            "points_reward": 100,
-            "badge_reward": "streak_starter",
-            "motivational_messages": [
-                "Start your logging streak today!",
-                "One meal at a time, one day at a time!",
-                "You're building a powerful habit!"
-            ]
-        }
-    
-    def _create_variety_challenge(self, user_analysis: Dict) -> Dict[str, Any]:
-        """Create a variety challenge"""
-        
-        current_variety = user_analysis["behavioral"]["variety_score"]
-        target_variety = min(0.8, current_variety + 0.2)  # 20% improvement
-        
-        return {
-            "challenge_type": ChallengeType.VARIETY,
-            "difficulty": ChallengeDifficulty.MEDIUM,
-            "title": "Food Explorer Challenge",
-            "description": f"Try {int(target_variety * 10)} different foods this week",
-            "target_value": int(target_variety * 10),
-            "unit": "unique_foods",
-            "duration_days": 7,
-            "baseline_data": {"current_variety": current_variety},
-            "target_improvement": 20,
-            "personalization_factors": {
-                "based_on": "low_food_variety",
-                "current_level": current_variety,
-                "improvement_needed": target_variety - current_variety
-            },
-            "points_reward": 130,
-            "badge_reward": "food_explorer",
-            "motivational_messages": [
-                "Discover new flavors and nutrients!",
-                "Variety is the spice of life!",
-                "Your taste buds will thank you!"
-            ]
-        }
-    
-    def _create_goal_challenge(self, user_analysis: Dict, goal_type: str) -> Dict[str, Any]:
-        """Create a goal-oriented challenge"""
-        
-        goal_challenges = {
-            "weight_loss": {
-                "title": "Calorie Control Week",
-                "description": "Stay within your calorie target for 7 days",
-                "target_value": 7,
-                "unit": "days"
-            },
-            "muscle_gain": {
-                "title": "Protein Power Week",
-                "description": "Hit your protein target for 7 days",
-                "target_value": 7,
-                "unit": "days"
-            },
-            "maintenance": {
-                "title": "Balance Master Week",
-                "description": "Maintain balanced nutrition for 7 days",
-                "target_value": 7,
-                "unit": "days"
+        if goal_type is not None:
+            goal_data = GOAL_CHALLENGE_TEMPLATES.get(goal_type, GOAL_CHALLENGE_TEMPLATES["maintenance"])
+            return {
+                **template["fields"],
+                **goal_data,
+                "baseline_data": {"goal_type": goal_type},
+                "personalization_factors": {
+                    "based_on": f"goal_progress_{goal_type}",
+                    "goal_type": goal_type,
+                    "improvement_needed": goal_data["target_value"]
+                },
+                "badge_reward": f"goal_{goal_type}_master",
+                "motivational_messages": [
+                    message.format(goal_type=goal_type) for message in template["motivational_messages"]
+                ]
             }
-        }
         
-        challenge_data = goal_challenges.get(goal_type, goal_challenges["maintenance"])
+        # Resolve the user's current level for the tracked metric
+        current_value = user_analysis if template["metric"] else 0
+        for key in template["metric"]:
+            current_value = current_value[key]
+        
+        # Personalize the target from the current level
+        rule, limit, factor = template["target_rule"]
+        if rule == "scale":
+            target = max(limit, current_value * factor)
+        elif rule == "step":
+            target = min(limit, current_value + factor)
+        else:
+            target = limit
+        target_value = int(target * template["target_scale"]) if template["target_scale"] else target
         
         return {
-            "challenge_type": ChallengeType.GOAL_ORIENTED,
-            "difficulty": ChallengeDifficulty.HARD,
-            "title": challenge_data["title"],
-            "description": challenge_data["description"],
-            "target_value": challenge_data["target_value"],
-            "unit": challenge_data["unit"],
-            "duration_days": 7,
-            "baseline_data": {"goal_type": goal_type},
-            "target_improvement": 100,
+            **template["fields"],
+            "description": template["description"].format(target_value=target_value),
+            "target_value": target_value,
+            "baseline_data": {template["baseline_key"]: current_value},
             "personalization_factors": {
-                "based_on": f"goal_progress_{goal_type}",
-                "goal_type": goal_type,
-                "improvement_needed": 7
+                "based_on": template["based_on"],
+                "current_level": current_value,
+                "improvement_needed": target - current_value
             },
-            "points_reward": 200,
-            "badge_reward": f"goal_{goal_type}_master",
-            "motivational_messages": [
-                f"You're working toward your {goal_type} goal!",
-                "Every day counts toward your success!",
-                "You're closer to your goal than you think!"
-            ]
+            "motivational_messages": list(template["motivational_messages"])
         }
     
     def _create_active_challenges(self, user_id: int, recommendations: List[Dict]) -> List[Dict[str, Any]]:
@@ -787,13 +871,15 @@ class DataDrivenChallengeGenerator:
     
     def _calculate_trend(self, values: List[float]) -> str:
         """Calculate trend in values"""
-        if len(values) < 2:
-            return "stable"
-        
-        # Simple linear trend calculation
-        x = list(range(len(values)))
-        slope = (len(values) * sum(x[i] * values[i] for i in range(len(values))) - 
-                sum(x) * sum(values)) / (len(values) * sum(x[i]**2 for i in range(len(values))) - sum(x)**2)
+        n = len(values)
+        if n < 3:
+            return "stable"  # Not enough data points for a meaningful trend
+        
+        # Simple linear trend calculation over x = 0..n-1, using closed forms for sum(x) and sum(x^2)
+        x_sum = n * (n - 1) // 2
+        x2_sum = (n - 1) * n * (2 * n - 1) // 6
+        xy_sum = sum(i * value for i, value in enumerate(values))
+        slope = (n * xy_sum - x_sum * sum(values)) / (n * x2_sum - x_sum ** 2)
         
         if slope > 0.1:
             return "increasing"
@@ -2,70 +2,156 @@
 """
 Enhanced data collection system for better user profiling
 """
+import atexit
+import copy
 import json
 import logging
+import queue
+import threading
+import time
+from types import MappingProxyType
+import numpy as np
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, load_only, sessionmaker
+from sqlalchemy import event, func, case, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.database import User, FoodItem, MealLog, FoodRating, Goal
 from app.models.enhanced_models import (
     UserCookingPattern, UserNutritionGoals, FoodPreferenceLearning,
+    FoodPreferenceContextCounter, FoodPreferenceSeasonCounter,
     ChatbotInteraction, SeasonalPreference, SocialCookingData
 )
+from app.services.enhanced_ml_recommendations import invalidate_profile
 
 logger = logging.getLogger(__name__)
 
+# Dialect-specific INSERT constructs that support ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert
+}
+
+# Onboarding fields that map directly onto UserCookingPattern columns
+COOKING_PATTERN_FIELDS = (
+    "cooking_frequency", "preferred_cooking_time", "cooking_skill_level", "preferred_cuisines",
+    "dietary_restrictions", "budget_range", "meal_prep_preference"
+)
+
+# Data quality components (breakdown keys) and their weights in the overall score
+QUALITY_SCORE_KEYS = (
+    "basic_profile", "cooking_profile", "nutrition_goals",
+    "meal_interactions", "rating_interactions", "chatbot_interactions"
+)
+QUALITY_SCORE_WEIGHTS = np.array([0.2, 0.2, 0.2, 0.2, 0.1, 0.1])
+
+# Base preference score adjustment per interaction type
+SCORE_ADJUSTMENTS = MappingProxyType({
+    "viewed": 0.01,
+    "cooked": 0.05,
+    "rated": 0.03,
+    "saved": 0.04,
+    "shared": 0.06,
+    "feedback": 0.02
+})
+
+# User columns read by _calculate_basic_profile_completeness
+PROFILE_COMPLETENESS_COLUMNS = (
+    User.age, User.weight, User.height, User.activity_level,
+    User.health_conditions, User.dietary_preferences, User.cuisine_pref
+)
+
+# Per-process cache of data quality scores: user_id -> (expires_at, result)
+QUALITY_CACHE_TTL_SECONDS = 300
+QUALITY_CACHE_MAX_SIZE = 10000
+_quality_cache: Dict[int, tuple] = {}
+_quality_cache_lock = threading.Lock()
+
+def _evict_user_caches(user_id: int):
+    """Drop a user's cached quality score and recommendation profile after their data changed"""
+    with _quality_cache_lock:
+        _quality_cache.pop(user_id, None)
+    # The upserts here are Core statements, which the profile cache's ORM listeners never see
+    invalidate_profile(user_id)
+
+# ORM models whose writes elsewhere in the app (meal logging, ratings, profile edits) change
+# a user's data quality inputs
+QUALITY_SOURCE_MODELS = (User, MealLog, FoodRating, UserCookingPattern, UserNutritionGoals)
+
+def _invalidate_quality(mapper, connection, target):
+    # User rows are keyed by their own id, the rest by user_id
+    _evict_user_caches(target.id if isinstance(target, User) else target.user_id)
+
+for _model in QUALITY_SOURCE_MODELS:
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _invalidate_quality)
+
+# Background chatbot interaction writer: events are flushed every CHAT_QUEUE_BATCH_SIZE
+# rows or CHAT_QUEUE_FLUSH_SECONDS, whichever comes first
+CHAT_QUEUE_BATCH_SIZE = 500
+CHAT_QUEUE_FLUSH_SECONDS = 1.0
+_chat_queue: "queue.Queue[Dict]" = queue.Queue()
+_chat_writer_lock = threading.Lock()
+_chat_writer: Optional[threading.Thread] = None
+
+# Current season and the monotonic time it was computed; seasons change monthly at most
+SEASON_CACHE_TTL_SECONDS = 3600
+_season_cache = [None, 0.0]
+
 class EnhancedDataCollector:
     """Enhanced data collection for better user profiling"""
     
     def __init__(self, db: Session):
         self.db = db
+        
+        # Every write path upserts with ON CONFLICT, so reject other databases up front
+        self.dialect = db.get_bind().dialect.name
+        if self.dialect not in UPSERT_INSERTS:
+            raise ValueError(
+                f"EnhancedDataCollector needs a PostgreSQL or SQLite database for its upserts, "
+                f"not {self.dialect}; check DATABASE_URL"
+            )
     
     def collect_user_onboarding_data(self, user_id: int, onboarding_data: Dict) -> Dict:
         """Collect comprehensive onboarding data from new users"""
         
         try:
             # Update basic user preferences
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if not user:
-                return {"success": False, "error": "User not found"}
-            
-            # Update dietary preferences
+            user_changes = {}
             if 'dietary_preferences' in onboarding_data:
-                user.dietary_preferences = json.dumps(onboarding_data['dietary_preferences'])
-            
-            # Update cuisine preference
+                user_changes["dietary_preferences"] = json.dumps(onboarding_data['dietary_preferences'])
             if 'cuisine_preference' in onboarding_data:
-                user.cuisine_pref = onboarding_data['cuisine_preference']
-            
-            # Create cooking pattern
-            cooking_pattern = UserCookingPattern(
-                user_id=user_id,
-                cooking_frequency=onboarding_data.get('cooking_frequency', 'moderate'),
-                preferred_cooking_time=onboarding_data.get('preferred_cooking_time', 'evening'),
-                cooking_skill_level=onboarding_data.get('cooking_skill_level', 'intermediate'),
-                preferred_cuisines=onboarding_data.get('preferred_cuisines', ['mixed']),
-                dietary_restrictions=onboarding_data.get('dietary_restrictions', {}),
-                budget_range=onboarding_data.get('budget_range', 'medium'),
-                meal_prep_preference=onboarding_data.get('meal_prep_preference', False),
-                last_updated=datetime.utcnow()
-            )
-            
-            # Check if pattern already exists
-            existing_pattern = self.db.query(UserCookingPattern).filter(
-                UserCookingPattern.user_id == user_id
-            ).first()
+                user_changes["cuisine_pref"] = onboarding_data['cuisine_preference']
             
-            if existing_pattern:
-                # Update existing pattern
-                for key, value in onboarding_data.items():
-                    if hasattr(existing_pattern, key):
-                        setattr(existing_pattern, key, value)
-                existing_pattern.last_updated = datetime.utcnow()
+            # UPDATE directly instead of loading the row; rowcount doubles as the existence check
+            if user_changes:
+                user_found = self.db.execute(
+                    update(User).where(User.id == user_id).values(**user_changes)
+                ).rowcount > 0
             else:
-                self.db.add(cooking_pattern)
+                user_found = self.db.execute(select(User.id).where(User.id == user_id)).first() is not None
+            if not user_found:
+                return {"success": False, "error": "User not found"}
+            
+            # Upsert cooking pattern: insert with defaults, or update only the provided fields
+            cooking_pattern_row = {
+                "user_id": user_id,
+                "cooking_frequency": onboarding_data.get('cooking_frequency', 'moderate'),
+                "preferred_cooking_time": onboarding_data.get('preferred_cooking_time', 'evening'),
+                "cooking_skill_level": onboarding_data.get('cooking_skill_level', 'intermediate'),
+                "preferred_cuisines": onboarding_data.get('preferred_cuisines', ['mixed']),
+                "dietary_restrictions": onboarding_data.get('dietary_restrictions', {}),
+                "budget_range": onboarding_data.get('budget_range', 'medium'),
+                "meal_prep_preference": onboarding_data.get('meal_prep_preference', False),
+                "last_updated": self._utc_now()
+            }
+            updated_fields = [field for field in COOKING_PATTERN_FIELDS if field in onboarding_data]
+            self.db.execute(self._build_upsert(
+                UserCookingPattern, [cooking_pattern_row], ["user_id"], updated_fields + ["last_updated"]
+            ))
             
             # Create nutrition goals if provided
             if 'nutrition_goals' in onboarding_data:
@@ -80,28 +166,32 @@ class EnhancedDataCollector:
                     target_fiber=goals_data.get('target_fiber'),
                     target_sodium=goals_data.get('target_sodium'),
                     target_sugar=goals_data.get('target_sugar'),
-                    start_date=datetime.utcnow(),
-                    target_date=datetime.utcnow() + timedelta(days=90),
+                    start_date=self._utc_now(),
+                    target_date=self._utc_now(days=90),
                     is_active=True,
-                    last_updated=datetime.utcnow()
+                    last_updated=self._utc_now()
                 )
                 self.db.add(nutrition_goal)
             
-            # Create social cooking data if provided
+            # Upsert social cooking data if provided
             if 'social_cooking' in onboarding_data:
                 social_data = onboarding_data['social_cooking']
-                social_cooking = SocialCookingData(
-                    user_id=user_id,
-                    cooking_for_others=social_data.get('cooking_for_others', False),
-                    family_size=social_data.get('family_size', 1),
-                    dietary_restrictions_family=social_data.get('family_dietary_restrictions', []),
-                    social_meal_preferences=social_data.get('social_meal_preferences', {}),
-                    shared_recipe_preferences=social_data.get('shared_recipe_preferences', {}),
-                    last_updated=datetime.utcnow()
-                )
-                self.db.add(social_cooking)
+                social_cooking_row = {
+                    "user_id": user_id,
+                    "cooking_for_others": social_data.get('cooking_for_others', False),
+                    "family_size": social_data.get('family_size', 1),
+                    "dietary_restrictions_family": social_data.get('family_dietary_restrictions', []),
+                    "social_meal_preferences": social_data.get('social_meal_preferences', {}),
+                    "shared_recipe_preferences": social_data.get('shared_recipe_preferences', {}),
+                    "last_updated": self._utc_now()
+                }
+                self.db.execute(self._build_upsert(
+                    SocialCookingData, [social_cooking_row], ["user_id"],
+                    [column for column in social_cooking_row if column != "user_id"]
+                ))
             
             self.db.commit()
+            _evict_user_caches(user_id)
             
             return {
                 "success": True,
@@ -109,101 +199,165 @@ class EnhancedDataCollector:
                 "data_points_collected": len(onboarding_data)
             }
             
-        except Exception as e:
+        except SQLAlchemyError as e:
+            self.db.rollback()
             logger.error(f"Error collecting onboarding data: {e}")
             return {"success": False, "error": str(e)}
     
     def track_food_interaction(self, user_id: int, food_id: int, interaction_type: str, 
-                             context: Dict = None, satisfaction: float = None) -> Dict:
+                             context: Dict = None, satisfaction: float = None,
+                             commit: bool = True) -> Dict:
         """Track detailed food interactions for better recommendations"""
         
         try:
-            # Get or create food preference learning record
-            preference_record = self.db.query(FoodPreferenceLearning).filter(
-                and_(
-                    FoodPreferenceLearning.user_id == user_id,
-                    FoodPreferenceLearning.food_item_id == food_id
-                )
-            ).first()
-            
-            if not preference_record:
-                preference_record = FoodPreferenceLearning(
-                    user_id=user_id,
-                    food_item_id=food_id,
-                    preference_score=0.5,  # Default neutral score
-                    context_preferences={},
-                    seasonal_preferences={},
-                    mood_preferences={},
-                    last_interaction=datetime.utcnow(),
-                    interaction_count=0
-                )
-                self.db.add(preference_record)
-            
-            # Update interaction count
-            preference_record.interaction_count += 1
-            preference_record.last_interaction = datetime.utcnow()
-            
-            # Update preference score based on interaction type
             score_adjustment = self._calculate_score_adjustment(interaction_type, satisfaction)
-            preference_record.preference_score = max(0, min(1, 
-                preference_record.preference_score + score_adjustment
-            ))
+            now = self._utc_now()
+            
+            # Insert a new record or atomically bump the existing one in a single statement;
+            # RETURNING hands back the updated values without a follow-up SELECT
+            stmt = self._build_upsert(
+                FoodPreferenceLearning,
+                [{
+                    "user_id": user_id,
+                    "food_item_id": food_id,
+                    "preference_score": self._clamp_score(0.5 + score_adjustment),  # Default neutral score
+                    "context_preferences": {},
+                    "seasonal_preferences": {},
+                    "mood_preferences": {},
+                    "last_interaction": now,
+                    "interaction_count": 1
+                }],
+                ["user_id", "food_item_id"],
+                update_values={
+                    "last_interaction": now,
+                    "interaction_count": func.coalesce(FoodPreferenceLearning.interaction_count, 0) + 1,
+                    "preference_score": self._clamp_score(FoodPreferenceLearning.preference_score + score_adjustment)
+                }
+            ).returning(
+                FoodPreferenceLearning.preference_score,
+                FoodPreferenceLearning.interaction_count
+            )
+            record = self.db.execute(stmt).one()
             
-            # Update context preferences
+            # Context and seasonal counts are narrow counter rows, so each bump rewrites one small row
             if context:
                 context_key = f"{context.get('meal_type', 'unknown')}_{context.get('time_of_day', 'unknown')}"
-                if context_key not in preference_record.context_preferences:
-                    preference_record.context_preferences[context_key] = 0
-                preference_record.context_preferences[context_key] += 1
-            
-            # Update seasonal preferences
-            current_season = self._get_current_season()
-            if current_season not in preference_record.seasonal_preferences:
-                preference_record.seasonal_preferences[current_season] = 0
-            preference_record.seasonal_preferences[current_season] += 1
+                self._increment_counter(FoodPreferenceContextCounter, user_id, food_id, "context_key", context_key)
+            self._increment_counter(
+                FoodPreferenceSeasonCounter, user_id, food_id, "season", self._get_current_season()
+            )
             
-            self.db.commit()
+            # Callers batching several writes into one transaction commit themselves
+            if commit:
+                self.db.commit()
+                _evict_user_caches(user_id)
             
             return {
                 "success": True,
                 "message": f"Food interaction tracked: {interaction_type}",
-                "new_preference_score": preference_record.preference_score,
-                "interaction_count": preference_record.interaction_count
+                "new_preference_score": record.preference_score,
+                "interaction_count": record.interaction_count
             }
             
-        except Exception as e:
+        except SQLAlchemyError as e:
+            self.db.rollback()
             logger.error(f"Error tracking food interaction: {e}")
             return {"success": False, "error": str(e)}
     
     def track_chatbot_interaction(self, user_id: int, query: str, agent_used: str, 
                                 response_type: str, satisfaction: float = None, 
-                                context_data: Dict = None) -> Dict:
+                                context_data: Dict = None, need_id: bool = False) -> Dict:
         """Track chatbot interactions for learning"""
         
+        if not need_id:
+            # Fire-and-forget: the background writer batches the INSERT off the request path
+            _start_chat_writer(self.db.get_bind())
+            _chat_queue.put({
+                "user_id": user_id,
+                "query": query,
+                "agent_used": agent_used,
+                "response_type": response_type,
+                "satisfaction": satisfaction,
+                "context_data": context_data,
+                "created_at": datetime.utcnow()
+            })
+            return {
+                "success": True,
+                "message": "Chatbot interaction queued",
+                "queued": True
+            }
+        
         try:
-            interaction = ChatbotInteraction(
-                user_id=user_id,
-                query=query,
-                agent_used=agent_used,
-                response_type=response_type,
-                user_satisfaction=satisfaction,
-                context_data=context_data or {},
-                created_at=datetime.utcnow()
-            )
-            
-            self.db.add(interaction)
+            # RETURNING hands back the new id, so it is not reloaded after the commit
+            interaction_id = self.db.execute(
+                insert(ChatbotInteraction).values(
+                    user_id=user_id,
+                    query=query,
+                    agent_used=agent_used,
+                    response_type=response_type,
+                    user_satisfaction=satisfaction,
+                    context_data=context_data or {},
+                    created_at=self._utc_now()
+                ).returning(ChatbotInteraction.id)
+            ).scalar_one()
             self.db.commit()
+            _evict_user_caches(user_id)
             
             return {
                 "success": True,
                 "message": "Chatbot interaction tracked",
-                "interaction_id": interaction.id
+                "interaction_id": interaction_id
             }
             
-        except Exception as e:
+        except SQLAlchemyError as e:
+            self.db.rollback()
             logger.error(f"Error tracking chatbot interaction: {e}")
             return {"success": False, "error": str(e)}
     
+    def track_chatbot_interactions_batch(self, interactions: List[Dict]) -> Dict:
+        """Track a batch of chatbot interactions with one multi-row INSERT"""
+        
+        try:
+            if not interactions:
+                return {"success": True, "message": "No chatbot interactions to track", "tracked_count": 0}
+            
+            required_fields = ("user_id", "query", "agent_used", "response_type")
+            invalid = [index for index, interaction in enumerate(interactions)
+                       if any(field not in interaction for field in required_fields)]
+            if invalid:
+                return {"success": False, "error": f"Interactions missing required fields at positions {invalid}"}
+            
+            now = datetime.utcnow()
+            rows = [
+                {
+                    "user_id": interaction["user_id"],
+                    "query": interaction["query"],
+                    "agent_used": interaction["agent_used"],
+                    "response_type": interaction["response_type"],
+                    "user_satisfaction": interaction.get("satisfaction"),
+                    "context_data": interaction.get("context_data") or {},
+                    "created_at": interaction.get("created_at") or now
+                }
+                for interaction in interactions
+            ]
+            
+            # executemany-style call; SQLAlchemy packs it into multi-row VALUES pages
+            self.db.execute(insert(ChatbotInteraction), rows)
+            self.db.commit()
+            for row in rows:
+                _evict_user_caches(row["user_id"])
+            
+            return {
+                "success": True,
+                "message": "Chatbot interactions tracked",
+                "tracked_count": len(rows)
+            }
+            
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Error tracking chatbot interactions batch: {e}")
+            return {"success": False, "error": str(e)}
+    
     def collect_user_feedback(self, user_id: int, feedback_type: str, 
                             feedback_data: Dict) -> Dict:
         """Collect user feedback for system improvement"""
@@ -216,12 +370,15 @@ class EnhancedDataCollector:
                 rating = feedback_data.get('rating', 3.0)
                 
                 if food_id:
-                    self.track_food_interaction(
+                    result = self.track_food_interaction(
                         user_id=user_id,
                         food_id=food_id,
                         interaction_type="feedback",
-                        satisfaction=rating
+                        satisfaction=rating,
+                        commit=False
                     )
+                    if not result["success"]:
+                        return result
             
             elif feedback_type == "chatbot_feedback":
                 # Update chatbot interaction
@@ -229,79 +386,87 @@ class EnhancedDataCollector:
                 agent_used = feedback_data.get('agent_used', 'unknown')
                 satisfaction = feedback_data.get('satisfaction', 3.0)
                 
-                self.track_chatbot_interaction(
+                result = self.track_chatbot_interaction(
                     user_id=user_id,
                     query=query,
                     agent_used=agent_used,
                     response_type="feedback",
                     satisfaction=satisfaction
                 )
+                if not result["success"]:
+                    return result
             
             elif feedback_type == "general_feedback":
                 # Store general feedback (could be in a new table)
                 logger.info(f"General feedback from user {user_id}: {feedback_data}")
             
+            self.db.commit()
+            _evict_user_caches(user_id)
+            
             return {
                 "success": True,
                 "message": f"Feedback collected: {feedback_type}",
                 "feedback_data": feedback_data
             }
             
-        except Exception as e:
+        except SQLAlchemyError as e:
+            self.db.rollback()
             logger.error(f"Error collecting feedback: {e}")
             return {"success": False, "error": str(e)}
     
     def get_user_data_quality_score(self, user_id: int) -> Dict:
         """Calculate data quality score for user"""
         
+        # Callers get their own copy, so changes to it never reach later cache hits
+        cached = _quality_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return copy.deepcopy(cached[1])
+        
         try:
-            # Get user data points
-            meal_count = self.db.query(MealLog).filter(MealLog.user_id == user_id).count()
-            rating_count = self.db.query(FoodRating).filter(FoodRating.user_id == user_id).count()
-            interaction_count = self.db.query(ChatbotInteraction).filter(
-                ChatbotInteraction.user_id == user_id
-            ).count()
-            
-            # Get user profile completeness
-            user = self.db.query(User).filter(User.id == user_id).first()
-            cooking_pattern = self.db.query(UserCookingPattern).filter(
+            # Fetch the user together with every data point count and profile flag in one round-trip
+            meals = select(func.count()).where(MealLog.user_id == user_id).scalar_subquery()
+            ratings = select(func.count()).where(FoodRating.user_id == user_id).scalar_subquery()
+            interactions = select(func.count()).where(ChatbotInteraction.user_id == user_id).scalar_subquery()
+            has_cooking_pattern = select(UserCookingPattern.id).where(
                 UserCookingPattern.user_id == user_id
-            ).first()
-            nutrition_goals = self.db.query(UserNutritionGoals).filter(
+            ).exists()
+            has_nutrition_goals = select(UserNutritionGoals.id).where(
                 UserNutritionGoals.user_id == user_id,
                 UserNutritionGoals.is_active == True
+            ).exists()
+            
+            row = self.db.execute(
+                select(
+                    User,
+                    meals.label("meal_count"),
+                    ratings.label("rating_count"),
+                    interactions.label("interaction_count"),
+                    has_cooking_pattern.label("cooking_pattern"),
+                    has_nutrition_goals.label("nutrition_goals")
+                ).options(load_only(*PROFILE_COMPLETENESS_COLUMNS)).where(User.id == user_id)
             ).first()
             
-            # Calculate completeness scores
-            basic_profile_score = self._calculate_basic_profile_completeness(user)
-            cooking_profile_score = 1.0 if cooking_pattern else 0.0
-            nutrition_goals_score = 1.0 if nutrition_goals else 0.0
+            if row:
+                user, meal_count, rating_count, interaction_count, cooking_pattern, nutrition_goals = row
+            else:
+                user, meal_count, rating_count, interaction_count, cooking_pattern, nutrition_goals = None, 0, 0, 0, False, False
             
-            # Calculate interaction scores
-            meal_interaction_score = min(1.0, meal_count / 30)  # 30 meals = full score
-            rating_interaction_score = min(1.0, rating_count / 20)  # 20 ratings = full score
-            chatbot_interaction_score = min(1.0, interaction_count / 10)  # 10 interactions = full score
+            # Completeness and interaction scores, in QUALITY_SCORE_KEYS order
+            scores = np.array([
+                self._calculate_basic_profile_completeness(user),
+                1.0 if cooking_pattern else 0.0,
+                1.0 if nutrition_goals else 0.0,
+                min(1.0, meal_count / 30),  # 30 meals = full score
+                min(1.0, rating_count / 20),  # 20 ratings = full score
+                min(1.0, interaction_count / 10)  # 10 interactions = full score
+            ])
             
             # Overall data quality score
-            overall_score = (
-                basic_profile_score * 0.2 +
-                cooking_profile_score * 0.2 +
-                nutrition_goals_score * 0.2 +
-                meal_interaction_score * 0.2 +
-                rating_interaction_score * 0.1 +
-                chatbot_interaction_score * 0.1
-            )
+            overall_score = float(scores @ QUALITY_SCORE_WEIGHTS)
             
-            return {
+            result = {
                 "overall_score": overall_score,
-                "breakdown": {
-                    "basic_profile": basic_profile_score,
-                    "cooking_profile": cooking_profile_score,
-                    "nutrition_goals": nutrition_goals_score,
-                    "meal_interactions": meal_interaction_score,
-                    "rating_interactions": rating_interaction_score,
-                    "chatbot_interactions": chatbot_interaction_score
-                },
+                "breakdown": dict(zip(QUALITY_SCORE_KEYS, scores.tolist())),
                 "data_points": {
                     "meals_logged": meal_count,
                     "foods_rated": rating_count,
@@ -314,42 +479,89 @@ class EnhancedDataCollector:
                 })
             }
             
-        except Exception as e:
+            with _quality_cache_lock:
+                if user_id not in _quality_cache and len(_quality_cache) >= QUALITY_CACHE_MAX_SIZE:
+                    _quality_cache.pop(next(iter(_quality_cache)), None)
+                _quality_cache[user_id] = (time.monotonic() + QUALITY_CACHE_TTL_SECONDS, result)
+            
+            return copy.deepcopy(result)
+            
+        except SQLAlchemyError as e:
+            self.db.rollback()
             logger.error(f"Error calculating data quality score: {e}")
             return {"success": False, "error": str(e)}
     
-    def _calculate_score_adjustment(self, interaction_type: str, satisfaction: float = None) -> float:
-        """Calculate score adjustment based on interaction type and satisfaction"""
+    def _build_upsert(self, model, rows: List[Dict], index_elements: List[str],
+                      update_columns: List[str] = (), update_values: Dict = None):
+        """Build a single-statement INSERT ... ON CONFLICT DO UPDATE for the session's dialect"""
+        
+        # update_columns take the incoming row's values; update_values are explicit SQL expressions
+        stmt = UPSERT_INSERTS[self.dialect](model).values(rows)
+        set_ = {column: stmt.excluded[column] for column in update_columns}
+        set_.update(update_values or {})
+        return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+    
+    def _increment_counter(self, model, user_id: int, food_id: int, key_column: str, key: str):
+        """Add 1 to a per user/food/key counter row, creating it on first use"""
+        
+        self.db.execute(self._build_upsert(
+            model,
+            [{"user_id": user_id, "food_item_id": food_id, key_column: key, "count": 1}],
+            ["user_id", "food_item_id", key_column],
+            update_values={"count": func.coalesce(model.count, 0) + 1}
+        ))
+    
+    def _utc_now(self, days: int = 0):
+        """SQL expression for the database's current UTC timestamp, optionally shifted by whole days"""
+        
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "sqlite":
+            return func.datetime("now", f"{days:+d} days")
+        if dialect == "postgresql":
+            now = func.timezone("UTC", func.now())
+            return now + func.make_interval(0, 0, 0, days) if days else now
+        
+        # No portable interval arithmetic elsewhere; fall back to the application clock
+        return datetime.utcnow() + timedelta(days=days)
+    
+    @staticmethod
+    def _clamp_score(score):
+        """Clamp a preference score (Python value or SQL expression) to the 0-1 range"""
         
-        base_adjustments = {
-            "viewed": 0.01,
-            "cooked": 0.05,
-            "rated": 0.03,
-            "saved": 0.04,
-            "shared": 0.06,
-            "feedback": 0.02
-        }
+        if isinstance(score, (int, float)):
+            return max(0, min(1, score))
+        return case((score > 1, 1.0), (score < 0, 0.0), else_=score)
+    
+    @staticmethod
+    def _calculate_score_adjustment(interaction_type: str, satisfaction: float = None) -> float:
+        """Calculate score adjustment based on interaction type and satisfaction"""
         
-        base_adjustment = base_adjustments.get(interaction_type, 0.01)
+        base_adjustment = SCORE_ADJUSTMENTS.get(interaction_type, 0.01)
         
         if satisfaction is not None:
-            # Adjust based on satisfaction (1-5 scale)
-            satisfaction_multiplier = (satisfaction - 3) / 2  # -1 to 1
-            return base_adjustment * (1 + satisfaction_multiplier)
+            # Scale by satisfaction (1-5 scale): 0x at 1, 1x at 3, 2x at 5
+            return base_adjustment * (satisfaction - 1) / 2
         
         return base_adjustment
     
     def _get_current_season(self) -> str:
         """Get current season based on date"""
+        now = time.monotonic()
+        if _season_cache[0] and now - _season_cache[1] < SEASON_CACHE_TTL_SECONDS:
+            return _season_cache[0]
+        
         month = datetime.now().month
-        if month in [12, 1, 2]:
-            return 'winter'
-        elif month in [3, 4, 5]:
-            return 'spring'
-        elif month in [6, 7, 8]:
-            return 'summer'
+        if month in (12, 1, 2):
+            season = 'winter'
+        elif month in (3, 4, 5):
+            season = 'spring'
+        elif month in (6, 7, 8):
+            season = 'summer'
         else:
-            return 'fall'
+            season = 'fall'
+        
+        _season_cache[:] = [season, now]
+        return season
     
     def _calculate_basic_profile_completeness(self, user: User) -> float:
         """Calculate how complete the basic user profile is"""
@@ -357,11 +569,11 @@ class EnhancedDataCollector:
         if not user:
             return 0.0
         
-        required_fields = ['age', 'weight', 'height', 'activity_level']
-        optional_fields = ['health_conditions', 'dietary_preferences', 'cuisine_pref']
+        required_values = (user.age, user.weight, user.height, user.activity_level)
+        optional_values = (user.health_conditions, user.dietary_preferences, user.cuisine_pref)
         
-        required_score = sum(1 for field in required_fields if getattr(user, field) is not None) / len(required_fields)
-        optional_score = sum(1 for field in optional_fields if getattr(user, field) is not None) / len(optional_fields)
+        required_score = sum(value is not None for value in required_values) / len(required_values)
+        optional_score = sum(value is not None for value in optional_values) / len(optional_values)
         
         return (required_score * 0.7) + (optional_score * 0.3)
     
@@ -387,3 +599,59 @@ class EnhancedDataCollector:
             recommendations.append("Great! Your profile is comprehensive and will provide excellent recommendations")
         
         return recommendations
+
+def _start_chat_writer(bind):
+    """Start the background chatbot interaction writer for this process if it is not running"""
+    
+    global _chat_writer
+    with _chat_writer_lock:
+        if _chat_writer and _chat_writer.is_alive():
+            return
+        
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+        _chat_writer = threading.Thread(
+            target=_run_chat_writer, args=(session_factory,), name="chatbot-interaction-writer", daemon=True
+        )
+        _chat_writer.start()
+        atexit.register(_stop_chat_writer, _chat_writer)
+
+def _stop_chat_writer(writer: threading.Thread):
+    """Ask the writer to flush what is queued and wait for it (used at interpreter shutdown)"""
+    
+    _chat_queue.put(None)
+    writer.join(timeout=10)
+
+def _run_chat_writer(session_factory):
+    """Drain the chatbot queue, writing one batch per flush window until a None sentinel arrives"""
+    
+    stopping = False
+    while not stopping:
+        batch = []
+        deadline = time.monotonic() + CHAT_QUEUE_FLUSH_SECONDS
+        while len(batch) < CHAT_QUEUE_BATCH_SIZE:
+            try:
+                # Block for the first event, then only until the flush window closes
+                timeout = None if not batch else max(0.0, deadline - time.monotonic())
+                event = _chat_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if event is None:
+                stopping = True
+                break
+            batch.append(event)
+        
+        if batch:
+            _write_chat_batch(session_factory, batch)
+
+def _write_chat_batch(session_factory, batch: List[Dict]):
+    """Insert a batch of queued chatbot interactions in its own session"""
+    
+    db = session_factory()
+    try:
+        result = EnhancedDataCollector(db).track_chatbot_interactions_batch(batch)
+        if not result["success"]:
+            logger.error(f"Dropped {len(batch)} queued chatbot interactions: {result['error']}")
+    except Exception as e:
+        logger.error(f"Error writing queued chatbot interactions: {e}")
+    finally:
+        db.close()
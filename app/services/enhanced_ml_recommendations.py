@@ -3,23 +3,28 @@
 Enhanced ML recommendation system with advanced personalization
 """
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Tuple, Optional, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, desc
+from typing import List, Dict, Set, Tuple, Optional, Any
+from sqlalchemy.orm import Session, joinedload, load_only, sessionmaker
+from sqlalchemy import event, func, and_, case, desc, select
+from sqlalchemy.engine import Row
 from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+import copy
+import heapq
 import json
-import math
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
+import re
+import threading
+import time
 import logging
 
-from app.database import User, FoodItem, MealLog, Goal
+from app.database import User, FoodItem, MealLog, Goal, PrepComplexity
 from app.database import FoodRating
 from app.models.enhanced_models import (
-    UserBehavior, RecipeInteraction, UserCookingPattern,
+    RecipeInteraction, UserCookingPattern,
     MealPlanAdherence, UserNutritionGoals, FoodPreferenceLearning,
     ChatbotInteraction, SeasonalPreference, SocialCookingData
 )
@@ -29,6 +34,150 @@ from app.services.social_cooking_service import SocialCookingService
 
 logger = logging.getLogger(__name__)
 
+# Per-process cache of comprehensive profiles: user_id -> (data_version, expires_at, profile).
+# data_version changes whenever the user logs a meal or rates a food; bump PROFILE_CACHE_VERSION
+# whenever the profile shape changes.
+PROFILE_CACHE_VERSION = "v1"
+PROFILE_CACHE_TTL_SECONDS = 600
+PROFILE_CACHE_MAX_SIZE = 10000
+_profile_cache: Dict[int, tuple] = {}
+_profile_cache_lock = threading.Lock()
+
+# Per-user tables the profile is built from; ORM writes to any of them evict the user's profile
+PROFILE_SOURCE_MODELS = (
+    MealLog, FoodRating, UserCookingPattern, UserNutritionGoals,
+    FoodPreferenceLearning, SocialCookingData, SeasonalPreference
+)
+
+def invalidate_profile(user_id: int):
+    """Drop a user's cached profile; Core INSERT/UPDATE writes must call this as they skip the ORM listeners"""
+    with _profile_cache_lock:
+        _profile_cache.pop(user_id, None)
+
+def _invalidate_profile(mapper, connection, target):
+    # Edits and deletes of older rows do not move the data version, so evict directly
+    invalidate_profile(target.user_id)
+
+for _model in PROFILE_SOURCE_MODELS:
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _invalidate_profile)
+
+# Column order of the per-day nutrient totals in the nutritional profile
+NUTRIENT_KEYS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sodium', 'sugar')
+
+SEASONS_BY_MONTH = {
+    12: 'winter', 1: 'winter', 2: 'winter',
+    3: 'spring', 4: 'spring', 5: 'spring',
+    6: 'summer', 7: 'summer', 8: 'summer',
+    9: 'fall', 10: 'fall', 11: 'fall'
+}
+
+# Default profile sections for users without data. They are shared between profiles and must
+# not be mutated; create_comprehensive_profile only ever hands out deep copies.
+DEFAULT_BASIC_PREFERENCES = {
+    'cuisine_preferences': {'mixed': {'preference_score': 0.5, 'frequency': 0.3}},
+    'total_meals_analyzed': 0
+}
+DEFAULT_COOKING_PROFILE = {
+    'cooking_frequency': 'moderate',
+    'skill_level': 'intermediate',
+    'preferred_cooking_time': 'evening',
+    'meal_prep_preference': False,
+    'budget_range': 'medium',
+    'interaction_stats': {'total_interactions': 0, 'cooking_rate': 0, 'saving_rate': 0, 'sharing_rate': 0}
+}
+DEFAULT_NUTRITIONAL_PROFILE = {
+    'current_intake': {'calories': 2000, 'protein': 150, 'carbs': 250, 'fat': 65, 'fiber': 25, 'sodium': 2300, 'sugar': 50},
+    'macro_ratios': {'protein_ratio': 25, 'carb_ratio': 45, 'fat_ratio': 30},
+    'goals': None,
+    'consistency_score': 0.5
+}
+# Daily fiber target (g) for active goals that do not set one
+DEFAULT_TARGET_FIBER_G = 25
+DEFAULT_SOCIAL_PREFERENCES = {
+    'cooking_for_others': False,
+    'family_size': 1,
+    'family_dietary_restrictions': [],
+    'social_meal_preferences': {},
+    'sharing_behavior': {}
+}
+
+# Name keywords that make a food more or less appropriate for each meal type
+MEAL_APPROPRIATENESS_KEYWORDS = {
+    'breakfast': {
+        'high': ['oats', 'eggs', 'yogurt', 'fruit', 'cereal', 'toast', 'pancake', 'smoothie'],
+        'medium': ['nuts', 'juice', 'cheese'],
+        'low': ['curry', 'fried rice', 'pizza', 'pasta']
+    },
+    'lunch': {
+        'high': ['salad', 'sandwich', 'soup', 'rice', 'quinoa', 'curry', 'stir fry'],
+        'medium': ['pasta', 'noodles', 'wrap'],
+        'low': ['dessert', 'cake', 'ice cream', 'cereal']
+    },
+    'dinner': {
+        'high': ['curry', 'stir fry', 'grilled', 'roasted', 'soup', 'pasta', 'rice'],
+        'medium': ['salad', 'sandwich'],
+        'low': ['cereal', 'toast', 'fruit', 'smoothie']
+    },
+    'snack': {
+        'high': ['nuts', 'fruit', 'yogurt', 'crackers', 'cheese'],
+        'medium': ['smoothie', 'juice'],
+        'low': ['curry', 'fried rice', 'pasta', 'heavy meal']
+    }
+}
+MEAL_APPROPRIATENESS_SCORES = {'high': 1.0, 'medium': 0.6, 'low': 0.2}
+
+# One compiled substring alternation per meal type and category, in priority order
+MEAL_APPROPRIATENESS_PATTERNS = {
+    meal_type: tuple(
+        (re.compile('|'.join(re.escape(keyword) for keyword in keywords)), MEAL_APPROPRIATENESS_SCORES[category])
+        for category, keywords in categories.items()
+    )
+    for meal_type, categories in MEAL_APPROPRIATENESS_KEYWORDS.items()
+}
+
+# The heavier profile analyses run concurrently, each in its own short-lived session. The executor is
+# shared by every request, so together they hold at most this many extra pooled connections
+PROFILE_ANALYZER_WORKERS = 4
+_profile_analyzer_executor = ThreadPoolExecutor(
+    max_workers=PROFILE_ANALYZER_WORKERS, thread_name_prefix="profile-analyzer"
+)
+
+# Cooking profile bonus for (skill_level, prep_complexity); any other pairing gets 0.075
+SKILL_PREP_BONUS = {
+    ('beginner', PrepComplexity.LOW): 0.15,
+    ('advanced', PrepComplexity.HIGH): 0.15
+}
+
+# Recommendation reason bits recorded by the scorer, and their reason strings in display order
+LOVES_CUISINE = 1
+HIGH_PROTEIN_FIT = 2
+HIGH_FIBER_FIT = 4
+SKILL_LOW_MATCH = 8
+SKILL_HIGH_MATCH = 16
+BUDGET_LOW_MATCH = 32
+BUDGET_HIGH_MATCH = 64
+REASON_TABLE = (
+    (LOVES_CUISINE, "Matches your love for {cuisine} cuisine"),
+    (HIGH_PROTEIN_FIT, "High in protein - helps meet your goals"),
+    (HIGH_FIBER_FIT, "Rich in fiber - supports your nutrition goals"),
+    (SKILL_LOW_MATCH, "Perfect for your cooking skill level"),
+    (SKILL_HIGH_MATCH, "Challenging recipe to showcase your skills"),
+    (BUDGET_LOW_MATCH, "Budget-friendly option"),
+    (BUDGET_HIGH_MATCH, "Premium ingredient for special occasions")
+)
+SKILL_REASON_BITS = {'beginner': SKILL_LOW_MATCH, 'advanced': SKILL_HIGH_MATCH}
+
+# Per-process cache of the distinct food cuisines, as (expires_at, cuisines in query order).
+# Cleared whenever a food item is inserted or updated through the ORM.
+AVAILABLE_CUISINES_TTL_SECONDS = 300
+_available_cuisines_cache: Dict[str, tuple] = {}
+
+@event.listens_for(FoodItem, "after_insert")
+@event.listens_for(FoodItem, "after_update")
+def _invalidate_available_cuisines(mapper, connection, target):
+    _available_cuisines_cache.clear()
+
 class AdvancedUserProfiler:
     """Advanced user profiling with multi-dimensional analysis"""
     
@@ -37,95 +186,152 @@ class AdvancedUserProfiler:
         self.food_rating_service = FoodRatingService(db)
         self.recipe_interaction_service = RecipeInteractionService(db)
         self.social_cooking_service = SocialCookingService(db)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
     
     def create_comprehensive_profile(self, user_id: int) -> Dict[str, Any]:
         """Create a comprehensive user profile from all available data"""
         
+        data_version = self._get_profile_data_version(user_id)
+        cached = _profile_cache.get(user_id)
+        if cached and cached[0] == data_version and cached[1] > time.monotonic():
+            return copy.deepcopy(cached[2])
+        
+        profile = self._build_comprehensive_profile(user_id)
+        
+        with _profile_cache_lock:
+            if user_id not in _profile_cache and len(_profile_cache) >= PROFILE_CACHE_MAX_SIZE:
+                _profile_cache.pop(next(iter(_profile_cache)), None)
+            _profile_cache[user_id] = (data_version, time.monotonic() + PROFILE_CACHE_TTL_SECONDS, profile)
+        
+        return copy.deepcopy(profile)
+    
+    def _get_profile_data_version(self, user_id: int) -> tuple:
+        """Version of the user's profile inputs: latest meal log and food rating timestamps"""
+        
+        latest_meal, latest_rating = self.db.execute(select(
+            select(func.max(MealLog.logged_at)).where(MealLog.user_id == user_id).scalar_subquery(),
+            select(func.max(FoodRating.created_at)).where(FoodRating.user_id == user_id).scalar_subquery()
+        )).one()
+        return (PROFILE_CACHE_VERSION, latest_meal, latest_rating)
+    
+    def _build_comprehensive_profile(self, user_id: int) -> Dict[str, Any]:
+        """Run every profile analysis for the user"""
+        
+        # Single as-of time for every date window and the current season
+        now = datetime.utcnow()
+        
+        # Last 30 days of meals with their food items, shared by the behavioral and nutritional analyses
+        # Only the columns the analyses read are loaded
+        recent_meals = self.db.query(MealLog).options(
+            load_only(
+                MealLog.id, MealLog.food_item_id, MealLog.logged_at, MealLog.planned, MealLog.quantity,
+                MealLog.calories, MealLog.protein, MealLog.carbs, MealLog.fat
+            ),
+            joinedload(MealLog.food_item).load_only(
+                FoodItem.cuisine_type, FoodItem.prep_complexity,
+                FoodItem.fiber_g, FoodItem.sodium_mg, FoodItem.sugar_g
+            )
+        ).filter(
+            MealLog.user_id == user_id,
+            MealLog.logged_at >= now - timedelta(days=30)
+        ).all()
+        
+        # The multi-query analyses are independent DB-bound work, so run them on the shared analyzer threads
+        analyzers = {
+            'basic_preferences': ('_analyze_basic_preferences', user_id, now),
+            'food_rating_insights': ('_analyze_food_rating_insights', user_id),
+            'recipe_interaction_insights': ('_analyze_recipe_interaction_insights', user_id),
+            'social_cooking_insights': ('_analyze_social_cooking_insights', user_id)
+        }
+        futures = {
+            key: _profile_analyzer_executor.submit(self._run_analyzer_in_session, *call)
+            for key, call in analyzers.items()
+        }
+        
+        # Single-query and meal-based analyses stay on this session, which already holds a connection
+        behavioral_patterns = self._analyze_behavioral_patterns(user_id, recent_meals)
+        nutritional_profile = self._analyze_nutritional_profile(user_id, recent_meals)
+        cooking_profile = self._analyze_cooking_profile(user_id)
+        social_preferences = self._analyze_social_preferences(user_id)
+        seasonal_patterns = self._analyze_seasonal_patterns(user_id, now)
+        interaction_history = self._analyze_interaction_history(user_id)
+        preference_confidence = self._calculate_preference_confidence(user_id)
+        
+        results = {key: future.result() for key, future in futures.items()}
+        
         profile = {
-            'basic_preferences': self._analyze_basic_preferences(user_id),
-            'behavioral_patterns': self._analyze_behavioral_patterns(user_id),
-            'cooking_profile': self._analyze_cooking_profile(user_id),
-            'nutritional_profile': self._analyze_nutritional_profile(user_id),
-            'social_preferences': self._analyze_social_preferences(user_id),
-            'seasonal_patterns': self._analyze_seasonal_patterns(user_id),
-            'interaction_history': self._analyze_interaction_history(user_id),
-            'food_rating_insights': self._analyze_food_rating_insights(user_id),
-            'recipe_interaction_insights': self._analyze_recipe_interaction_insights(user_id),
-            'social_cooking_insights': self._analyze_social_cooking_insights(user_id),
-            'preference_confidence': self._calculate_preference_confidence(user_id)
+            'basic_preferences': results['basic_preferences'],
+            'behavioral_patterns': behavioral_patterns,
+            'cooking_profile': cooking_profile,
+            'nutritional_profile': nutritional_profile,
+            'social_preferences': social_preferences,
+            'seasonal_patterns': seasonal_patterns,
+            'interaction_history': interaction_history,
+            'food_rating_insights': results['food_rating_insights'],
+            'recipe_interaction_insights': results['recipe_interaction_insights'],
+            'social_cooking_insights': results['social_cooking_insights'],
+            'preference_confidence': preference_confidence
         }
         
         return profile
     
-    def _analyze_basic_preferences(self, user_id: int) -> Dict:
+    def _run_analyzer_in_session(self, method_name: str, *args) -> Any:
+        """Run one profile analysis with its own session (sessions are not thread-safe)"""
+        with self.session_factory() as session:
+            return getattr(AdvancedUserProfiler(session), method_name)(*args)
+    
+    def _analyze_basic_preferences(self, user_id: int, now: Optional[datetime] = None) -> Dict:
         """Analyze basic food and cuisine preferences"""
-        # Get meal history
-        meals = self.db.query(MealLog).join(FoodItem).filter(
+        now = now or datetime.utcnow()
+        # Aggregate meal history per cuisine, with the user's rating of each meal's food, in one query
+        cuisine_rows = self.db.query(
+            FoodItem.cuisine_type,
+            func.count(MealLog.id).label('count'),
+            func.sum(case((MealLog.planned == True, 1), else_=0)).label('planned_count'),
+            func.coalesce(func.sum(FoodRating.rating), 0).label('rating_sum')
+        ).select_from(MealLog).join(FoodItem).outerjoin(
+            FoodRating,
+            and_(FoodRating.user_id == user_id, FoodRating.food_id == MealLog.food_item_id)
+        ).filter(
             MealLog.user_id == user_id,
-            MealLog.logged_at >= datetime.utcnow() - timedelta(days=90)
-        ).all()
+            MealLog.logged_at >= now - timedelta(days=90)
+        ).group_by(FoodItem.cuisine_type).order_by(func.min(MealLog.logged_at)).all()
         
-        if not meals:
+        if not cuisine_rows:
             return self._get_default_preferences()
         
-        # Analyze cuisine preferences
-        cuisine_prefs = defaultdict(lambda: {'count': 0, 'rating_sum': 0, 'planned_count': 0})
-        
-        for meal in meals:
-            if meal.food_item and meal.food_item.cuisine_type:
-                cuisine = meal.food_item.cuisine_type
-                cuisine_prefs[cuisine]['count'] += 1
-                cuisine_prefs[cuisine]['planned_count'] += (1 if meal.planned else 0)
-                
-                # Get user rating if available
-                rating = self.db.query(FoodRating).filter(
-                    FoodRating.user_id == user_id,
-                    FoodRating.food_id == meal.food_item_id
-                ).first()
-                
-                if rating:
-                    cuisine_prefs[cuisine]['rating_sum'] += rating.rating
-        
-        # Calculate preference scores
-        total_meals = len(meals)
-        cuisine_scores = {}
-        
-        for cuisine, data in cuisine_prefs.items():
-            frequency = data['count'] / total_meals
-            planning_preference = data['planned_count'] / data['count'] if data['count'] > 0 else 0
-            avg_rating = data['rating_sum'] / data['count'] if data['count'] > 0 else 3.0
-            
-            # Weighted score: frequency * planning_preference * rating
-            score = frequency * (0.3 + 0.7 * planning_preference) * (avg_rating / 5.0)
-            
-            cuisine_scores[cuisine] = {
-                'preference_score': score,
-                'frequency': frequency,
-                'planning_preference': planning_preference,
-                'avg_rating': avg_rating,
-                'meal_count': data['count']
+        # Calculate preference scores for all cuisines at once
+        total_meals = sum(row.count for row in cuisine_rows)
+        cuisine_rows = [row for row in cuisine_rows if row.cuisine_type]
+        counts = np.fromiter((row.count for row in cuisine_rows), dtype=np.float64, count=len(cuisine_rows))
+        planned_counts = np.fromiter((row.planned_count for row in cuisine_rows), dtype=np.float64, count=len(cuisine_rows))
+        rating_sums = np.fromiter((row.rating_sum for row in cuisine_rows), dtype=np.float64, count=len(cuisine_rows))
+        
+        frequencies = counts / total_meals
+        planning_preferences = planned_counts / counts
+        avg_ratings = rating_sums / counts
+        
+        # Weighted score: frequency * planning_preference * rating
+        scores = frequencies * (0.3 + 0.7 * planning_preferences) * (avg_ratings / 5.0)
+        
+        cuisine_scores = {
+            cuisine_rows[i].cuisine_type: {
+                'preference_score': scores[i].item(),
+                'frequency': frequencies[i].item(),
+                'planning_preference': planning_preferences[i].item(),
+                'avg_rating': avg_ratings[i].item(),
+                'meal_count': cuisine_rows[i].count
             }
+            for i in np.argsort(-scores, kind='stable')
+        }
         
         return {
-            'cuisine_preferences': dict(sorted(cuisine_scores.items(), 
-                                             key=lambda x: x[1]['preference_score'], 
-                                             reverse=True)),
+            'cuisine_preferences': cuisine_scores,
             'total_meals_analyzed': total_meals
         }
     
-    def _analyze_behavioral_patterns(self, user_id: int) -> Dict:
-        """Analyze user behavioral patterns"""
-        
-        # Get behavioral data
-        behaviors = self.db.query(UserBehavior).filter(
-            UserBehavior.user_id == user_id
-        ).all()
-        
-        # Get meal logging patterns
-        meals = self.db.query(MealLog).filter(
-            MealLog.user_id == user_id,
-            MealLog.logged_at >= datetime.utcnow() - timedelta(days=30)
-        ).all()
+    def _analyze_behavioral_patterns(self, user_id: int, meals: List[MealLog]) -> Dict:
+        """Analyze user behavioral patterns from the last 30 days of meals"""
         
         patterns = {
             'meal_regularity': self._calculate_meal_regularity(meals),
@@ -152,11 +358,13 @@ class AdvancedUserProfiler:
             RecipeInteraction.user_id == user_id
         ).all()
         
+        interaction_counts = Counter(r.interaction_type for r in recipe_interactions)
+        total_interactions = max(len(recipe_interactions), 1)
         interaction_stats = {
             'total_interactions': len(recipe_interactions),
-            'cooking_rate': len([r for r in recipe_interactions if r.interaction_type == 'cooked']) / max(len(recipe_interactions), 1),
-            'saving_rate': len([r for r in recipe_interactions if r.interaction_type == 'saved']) / max(len(recipe_interactions), 1),
-            'sharing_rate': len([r for r in recipe_interactions if r.interaction_type == 'shared']) / max(len(recipe_interactions), 1)
+            'cooking_rate': interaction_counts['cooked'] / total_interactions,
+            'saving_rate': interaction_counts['saved'] / total_interactions,
+            'sharing_rate': interaction_counts['shared'] / total_interactions
         }
         
         return {
@@ -168,8 +376,8 @@ class AdvancedUserProfiler:
             'interaction_stats': interaction_stats
         }
     
-    def _analyze_nutritional_profile(self, user_id: int) -> Dict:
-        """Analyze user's nutritional patterns and goals"""
+    def _analyze_nutritional_profile(self, user_id: int, recent_meals: List[MealLog]) -> Dict:
+        """Analyze user's nutritional patterns and goals from the last 30 days of meals"""
         
         # Get nutrition goals
         nutrition_goals = self.db.query(UserNutritionGoals).filter(
@@ -177,43 +385,31 @@ class AdvancedUserProfiler:
             UserNutritionGoals.is_active == True
         ).first()
         
-        # Get recent meal data for analysis
-        meals = self.db.query(MealLog).join(FoodItem).filter(
-            MealLog.user_id == user_id,
-            MealLog.logged_at >= datetime.utcnow() - timedelta(days=30)
-        ).all()
+        # Only meals with a known food item carry full nutrient data
+        meals = [meal for meal in recent_meals if meal.food_item]
         
         if not meals:
             return self._get_default_nutritional_profile()
         
-        # Calculate daily nutritional averages
-        daily_nutrition = defaultdict(lambda: {
-            'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0,
-            'fiber': 0, 'sodium': 0, 'sugar': 0, 'meal_count': 0
-        })
-        
-        for meal in meals:
-            date = meal.logged_at.date()
-            daily_nutrition[date]['calories'] += meal.calories
-            daily_nutrition[date]['protein'] += meal.protein
-            daily_nutrition[date]['carbs'] += meal.carbs
-            daily_nutrition[date]['fat'] += meal.fat
-            daily_nutrition[date]['fiber'] += meal.food_item.fiber_g * meal.quantity
-            daily_nutrition[date]['sodium'] += meal.food_item.sodium_mg * meal.quantity
-            daily_nutrition[date]['sugar'] += meal.food_item.sugar_g * meal.quantity
-            daily_nutrition[date]['meal_count'] += 1
+        # Calculate daily nutritional averages: one row per meal, summed into one row per day
+        meal_nutrients = np.array([
+            (
+                meal.calories, meal.protein, meal.carbs, meal.fat,
+                meal.food_item.fiber_g * meal.quantity,
+                meal.food_item.sodium_mg * meal.quantity,
+                meal.food_item.sugar_g * meal.quantity
+            )
+            for meal in meals
+        ], dtype=np.float64)
+        meal_days = np.fromiter((meal.logged_at.toordinal() for meal in meals), dtype=np.int64, count=len(meals))
+        _, day_index = np.unique(meal_days, return_inverse=True)
+        daily_nutrition = np.column_stack([
+            np.bincount(day_index, weights=meal_nutrients[:, column])
+            for column in range(len(NUTRIENT_KEYS))
+        ])
         
         # Calculate averages
-        nutrition_data = list(daily_nutrition.values())
-        avg_daily = {
-            'calories': np.mean([d['calories'] for d in nutrition_data]),
-            'protein': np.mean([d['protein'] for d in nutrition_data]),
-            'carbs': np.mean([d['carbs'] for d in nutrition_data]),
-            'fat': np.mean([d['fat'] for d in nutrition_data]),
-            'fiber': np.mean([d['fiber'] for d in nutrition_data]),
-            'sodium': np.mean([d['sodium'] for d in nutrition_data]),
-            'sugar': np.mean([d['sugar'] for d in nutrition_data])
-        }
+        avg_daily = dict(zip(NUTRIENT_KEYS, daily_nutrition.mean(axis=0).tolist()))
         
         # Calculate macro ratios
         total_calories = avg_daily['calories']
@@ -233,9 +429,10 @@ class AdvancedUserProfiler:
                 'target_calories': nutrition_goals.target_calories if nutrition_goals else 2000,
                 'target_protein': nutrition_goals.target_protein if nutrition_goals else 150,
                 'target_carbs': nutrition_goals.target_carbs if nutrition_goals else 250,
-                'target_fat': nutrition_goals.target_fat if nutrition_goals else 65
+                'target_fat': nutrition_goals.target_fat if nutrition_goals else 65,
+                'target_fiber': nutrition_goals.target_fiber or DEFAULT_TARGET_FIBER_G
             } if nutrition_goals else None,
-            'consistency_score': self._calculate_nutrition_consistency(nutrition_data)
+            'consistency_score': self._calculate_nutrition_consistency(daily_nutrition[:, 0])
         }
     
     def _analyze_social_preferences(self, user_id: int) -> Dict:
@@ -256,17 +453,18 @@ class AdvancedUserProfiler:
             'sharing_behavior': social_data.shared_recipe_preferences
         }
     
-    def _analyze_seasonal_patterns(self, user_id: int) -> Dict:
+    def _analyze_seasonal_patterns(self, user_id: int, now: Optional[datetime] = None) -> Dict:
         """Analyze seasonal food preferences"""
         
+        current_season = self._get_current_season(now)
+        
         seasonal_prefs = self.db.query(SeasonalPreference).filter(
             SeasonalPreference.user_id == user_id
         ).all()
         
         if not seasonal_prefs:
-            return self._get_default_seasonal_preferences()
+            return self._get_default_seasonal_preferences(current_season)
         
-        current_season = self._get_current_season()
         current_prefs = next((p for p in seasonal_prefs if p.season == current_season), None)
         
         return {
@@ -290,7 +488,7 @@ class AdvancedUserProfiler:
             return {'interaction_count': 0, 'preferred_agents': [], 'satisfaction_avg': 0}
         
         # Analyze agent preferences
-        agent_usage = Counter([i.agent_used for i in chatbot_interactions])
+        agent_usage = Counter(i.agent_used for i in chatbot_interactions)
         satisfaction_scores = [i.user_satisfaction for i in chatbot_interactions if i.user_satisfaction]
         
         return {
@@ -303,10 +501,12 @@ class AdvancedUserProfiler:
     def _calculate_preference_confidence(self, user_id: int) -> float:
         """Calculate confidence in user preferences based on data quality"""
         
-        # Get data points
-        meal_count = self.db.query(MealLog).filter(MealLog.user_id == user_id).count()
-        rating_count = self.db.query(FoodRating).filter(FoodRating.user_id == user_id).count()
-        interaction_count = self.db.query(ChatbotInteraction).filter(ChatbotInteraction.user_id == user_id).count()
+        # Get data points in a single round trip
+        meal_count, rating_count, interaction_count = self.db.query(
+            select(func.count(MealLog.id)).where(MealLog.user_id == user_id).scalar_subquery(),
+            select(func.count(FoodRating.id)).where(FoodRating.user_id == user_id).scalar_subquery(),
+            select(func.count(ChatbotInteraction.id)).where(ChatbotInteraction.user_id == user_id).scalar_subquery()
+        ).one()
         
         # Calculate confidence score (0-1)
         confidence = min(1.0, (
@@ -324,16 +524,14 @@ class AdvancedUserProfiler:
             return 0.0
         
         # Group by day and count meals per day
-        daily_meal_counts = Counter([meal.logged_at.date() for meal in meals])
-        counts = list(daily_meal_counts.values())
+        daily_meal_counts = Counter(meal.logged_at.date() for meal in meals)
+        counts = np.fromiter(daily_meal_counts.values(), dtype=np.int32, count=len(daily_meal_counts))
         
         if len(counts) < 2:
             return 0.5
         
         # Regularity = 1 - (standard_deviation / mean)
-        mean_count = np.mean(counts)
-        std_count = np.std(counts)
-        regularity = max(0, 1 - (std_count / mean_count))
+        regularity = max(0, 1 - (counts.std() / counts.mean()))
         
         return regularity
     
@@ -343,8 +541,8 @@ class AdvancedUserProfiler:
             return 'unknown'
         
         # Analyze meal types and complexity
-        complex_meals = [m for m in meals if m.food_item and m.food_item.prep_complexity in ['high', 'medium']]
-        cooking_ratio = len(complex_meals) / len(meals)
+        complex_meals = sum(1 for m in meals if m.food_item and m.food_item.prep_complexity in {'high', 'medium'})
+        cooking_ratio = complex_meals / len(meals)
         
         if cooking_ratio > 0.7:
             return 'frequent'
@@ -387,68 +585,39 @@ class AdvancedUserProfiler:
             return 0.0
         
         # Calculate how often user tries new foods
-        new_foods = [p for p in preferences if p.interaction_count == 1]
-        return len(new_foods) / len(preferences)
+        new_foods = sum(1 for p in preferences if p.interaction_count == 1)
+        return new_foods / len(preferences)
     
-    def _calculate_nutrition_consistency(self, nutrition_data: List[Dict]) -> float:
-        """Calculate consistency in nutritional intake"""
-        if len(nutrition_data) < 2:
+    def _calculate_nutrition_consistency(self, calories: np.ndarray) -> float:
+        """Calculate consistency in daily calorie intake"""
+        if len(calories) < 2:
             return 0.5
         
-        calories = [d['calories'] for d in nutrition_data]
-        cv = np.std(calories) / np.mean(calories) if np.mean(calories) > 0 else 1
+        mean_calories = calories.mean()
+        cv = calories.std() / mean_calories if mean_calories > 0 else 1
         
         # Consistency = 1 - coefficient of variation
         return max(0, 1 - cv)
     
-    def _get_current_season(self) -> str:
+    def _get_current_season(self, now: Optional[datetime] = None) -> str:
         """Get current season based on date"""
-        month = datetime.now().month
-        if month in [12, 1, 2]:
-            return 'winter'
-        elif month in [3, 4, 5]:
-            return 'spring'
-        elif month in [6, 7, 8]:
-            return 'summer'
-        else:
-            return 'fall'
+        return SEASONS_BY_MONTH[(now or datetime.now()).month]
     
     def _get_default_preferences(self) -> Dict:
-        return {
-            'cuisine_preferences': {'mixed': {'preference_score': 0.5, 'frequency': 0.3}},
-            'total_meals_analyzed': 0
-        }
+        return DEFAULT_BASIC_PREFERENCES
     
     def _get_default_cooking_profile(self) -> Dict:
-        return {
-            'cooking_frequency': 'moderate',
-            'skill_level': 'intermediate',
-            'preferred_cooking_time': 'evening',
-            'meal_prep_preference': False,
-            'budget_range': 'medium',
-            'interaction_stats': {'total_interactions': 0, 'cooking_rate': 0, 'saving_rate': 0, 'sharing_rate': 0}
-        }
+        return DEFAULT_COOKING_PROFILE
     
     def _get_default_nutritional_profile(self) -> Dict:
-        return {
-            'current_intake': {'calories': 2000, 'protein': 150, 'carbs': 250, 'fat': 65, 'fiber': 25, 'sodium': 2300, 'sugar': 50},
-            'macro_ratios': {'protein_ratio': 25, 'carb_ratio': 45, 'fat_ratio': 30},
-            'goals': None,
-            'consistency_score': 0.5
-        }
+        return DEFAULT_NUTRITIONAL_PROFILE
     
     def _get_default_social_preferences(self) -> Dict:
-        return {
-            'cooking_for_others': False,
-            'family_size': 1,
-            'family_dietary_restrictions': [],
-            'social_meal_preferences': {},
-            'sharing_behavior': {}
-        }
+        return DEFAULT_SOCIAL_PREFERENCES
     
-    def _get_default_seasonal_preferences(self) -> Dict:
+    def _get_default_seasonal_preferences(self, current_season: Optional[str] = None) -> Dict:
         return {
-            'current_season': self._get_current_season(),
+            'current_season': current_season or self._get_current_season(),
             'seasonal_preferences': {},
             'current_recommendations': []
         }
@@ -469,22 +638,23 @@ class AdvancedUserProfiler:
                 }
             
             # Analyze rating patterns
-            ratings = [rating["rating"] for rating in user_ratings]
-            avg_rating = sum(ratings) / len(ratings)
+            ratings = np.fromiter((rating["rating"] for rating in user_ratings), dtype=np.float64, count=len(user_ratings))
+            avg_rating = float(ratings.mean())
             
             # Calculate rating consistency (lower standard deviation = more consistent)
-            rating_std = math.sqrt(sum((r - avg_rating) ** 2 for r in ratings) / len(ratings))
+            rating_std = float(ratings.std())
             rating_consistency = max(0, 1 - (rating_std / 2.0))  # Normalize to 0-1
             
             # Analyze preferred food types based on high ratings (4.0+)
-            high_rated_foods = [r for r in user_ratings if r["rating"] >= 4.0]
+            high_rated_count = sum(1 for r in user_ratings if r["rating"] >= 4.0)
             
-            # Get food details for high-rated foods
-            preferred_food_types = []
-            for rating in high_rated_foods[:10]:  # Top 10 high-rated foods
-                food_item = self.db.query(FoodItem).filter(FoodItem.id == rating["food_id"]).first()
-                if food_item and food_item.cuisine_type:
-                    preferred_food_types.append(food_item.cuisine_type)
+            # Get cuisines of the top 10 high-rated foods in one query
+            high_rated_ids = list(islice((r["food_id"] for r in user_ratings if r["rating"] >= 4.0), 10))
+            preferred_food_types = self.db.query(FoodItem.cuisine_type).filter(
+                FoodItem.id.in_(high_rated_ids),
+                FoodItem.cuisine_type.isnot(None),
+                FoodItem.cuisine_type != ''
+            ).all() if high_rated_ids else []
             
             # Calculate rating confidence based on number of ratings
             rating_confidence = min(1.0, len(user_ratings) / 20.0)  # Max confidence at 20+ ratings
@@ -493,10 +663,10 @@ class AdvancedUserProfiler:
                 "rating_pattern": "consistent" if rating_consistency > 0.7 else "variable",
                 "average_rating": round(avg_rating, 2),
                 "rating_consistency": round(rating_consistency, 2),
-                "preferred_food_types": list(set(preferred_food_types)),
+                "preferred_food_types": list({cuisine_type for (cuisine_type,) in preferred_food_types}),
                 "rating_confidence": round(rating_confidence, 2),
                 "total_ratings": len(user_ratings),
-                "high_rated_count": len(high_rated_foods)
+                "high_rated_count": high_rated_count
             }
             
         except Exception as e:
@@ -519,8 +689,7 @@ class AdvancedUserProfiler:
                 }
             
             # Analyze interaction patterns
-            interaction_types = [interaction["interaction_type"] for interaction in interactions]
-            interaction_counts = Counter(interaction_types)
+            interaction_counts = Counter(interaction["interaction_type"] for interaction in interactions)
             
             # Determine engagement level
             total_interactions = len(interactions)
@@ -546,7 +715,7 @@ class AdvancedUserProfiler:
             behavior_insights = self.recipe_interaction_service.get_cooking_behavior_insights(user_id)
             
             return {
-                "interaction_pattern": "active" if engagement_level in ["high", "medium"] else "passive",
+                "interaction_pattern": "active" if engagement_level in {"high", "medium"} else "passive",
                 "engagement_level": engagement_level,
                 "cooking_frequency": cooking_frequency,
                 "preferred_interaction_types": [item[0] for item in interaction_counts.most_common(3)],
@@ -610,12 +779,26 @@ class AdvancedUserProfiler:
             return {"error": str(e)}
 
 
+@dataclass(frozen=True)
+class FoodScoringContext:
+    """Per-request profile values shared by food scoring and recommendation reasons"""
+    meal_type: str
+    cuisine_scores: Dict[str, float]
+    protein_deficit: bool
+    fiber_deficit: bool
+    skill_level: str
+    budget_range: str
+    variety_seeking: float
+    recent_cuisines: Set[str]
+
 class IntelligentRecommendationEngine:
     """Enhanced recommendation engine with advanced personalization"""
     
     def __init__(self, db: Session):
         self.db = db
         self.profiler = AdvancedUserProfiler(db)
+        # Recent food ids and cuisines per (user_id, days), reset for every recommendation request
+        self._recent_foods_cache: Dict[Tuple[int, int], Tuple[List[int], Set[str]]] = {}
     
     def get_personalized_recommendations(self, user: User, context: Dict = None) -> Dict[str, Any]:
         """Get highly personalized recommendations based on comprehensive user profile"""
@@ -643,16 +826,23 @@ class IntelligentRecommendationEngine:
         meal_type = context.get('meal_type', 'lunch') if context else 'lunch'
         max_recommendations = context.get('max_recommendations', 10) if context else 10
         
-        # Get user's food preferences
-        food_preferences = self.db.query(FoodPreferenceLearning).filter(
-            FoodPreferenceLearning.user_id == user.id
-        ).all()
+        self._recent_foods_cache.clear()
         
-        # Create preference scores
-        preference_scores = {fp.food_item_id: fp.preference_score for fp in food_preferences}
+        # Get user's food preference scores, joined onto candidates (0.5 for foods without history)
+        food_preferences = self.db.query(
+            FoodPreferenceLearning.food_item_id,
+            FoodPreferenceLearning.preference_score
+        ).filter(FoodPreferenceLearning.user_id == user.id).subquery()
+        preference_score = func.coalesce(food_preferences.c.preference_score, 0.5)
         
-        # Get candidate foods
-        query = self.db.query(FoodItem)
+        # Get candidate foods, only the columns used for scoring and the response
+        query = self.db.query(
+            FoodItem.id, FoodItem.name, FoodItem.cuisine_type, FoodItem.calories,
+            FoodItem.protein_g, FoodItem.carbs_g, FoodItem.fat_g, FoodItem.fiber_g,
+            FoodItem.cost, FoodItem.prep_complexity, preference_score.label('preference_score')
+        ).outerjoin(
+            food_preferences, food_preferences.c.food_item_id == FoodItem.id
+        )
         
         # Apply filters based on user profile
         basic_prefs = profile['basic_preferences']
@@ -685,22 +875,33 @@ class IntelligentRecommendationEngine:
             # Prefer foods that match seasonal preferences
             pass  # This would require more complex filtering
         
-        # Get recent foods to avoid repetition
-        recent_foods = self._get_recent_foods(user.id, days=7)
-        if recent_foods:
-            query = query.filter(~FoodItem.id.in_(recent_foods))
-        
-        # Get candidate foods
-        candidate_foods = query.limit(100).all()
-        
-        # Score foods using multiple algorithms
-        scored_foods = []
-        for food in candidate_foods:
-            score = self._calculate_advanced_food_score(
-                food, profile, meal_type, preference_scores.get(food.id, 0.5)
-            )
-            
-            scored_foods.append({
+        # Skip foods eaten in the last week to avoid repetition
+        eaten_recently = self.db.query(MealLog.id).filter(
+            MealLog.user_id == user.id,
+            MealLog.logged_at >= datetime.utcnow() - timedelta(days=7),
+            MealLog.food_item_id == FoodItem.id
+        ).exists()
+        query = query.filter(~eaten_recently)
+        
+        # Get candidate foods, most preferred first
+        candidate_foods = query.order_by(preference_score.desc(), FoodItem.id).limit(100).all()
+        
+        # Cuisines eaten in the last two weeks, for variety seeking
+        _, recent_cuisines = self._get_recent_foods(user.id, days=14, include_cuisines=True)
+        scoring_ctx = self._build_scoring_context(profile, meal_type, recent_cuisines)
+        
+        # Score all candidate foods at once using multiple algorithms
+        scores, reason_masks = self._calculate_advanced_food_scores(candidate_foods, scoring_ctx)
+        scores = scores.tolist()
+        reason_masks = reason_masks.tolist()
+        
+        # Keep the top recommendations (nlargest is stable, like sort + slice) and only describe those
+        top_indices = heapq.nlargest(max_recommendations, range(len(scores)), key=scores.__getitem__)
+        
+        recommendations = []
+        for index in top_indices:
+            food = candidate_foods[index]
+            recommendations.append({
                 'food_id': food.id,
                 'name': food.name,
                 'cuisine_type': food.cuisine_type,
@@ -710,98 +911,97 @@ class IntelligentRecommendationEngine:
                 'fat_g': food.fat_g,
                 'cost': food.cost,
                 'prep_complexity': food.prep_complexity,
-                'recommendation_score': score,
-                'recommendation_reasons': self._generate_recommendation_reasons(food, profile, meal_type)
+                'recommendation_score': scores[index],
+                'recommendation_reasons': self._generate_recommendation_reasons(reason_masks[index], food.cuisine_type)
             })
         
-        # Sort by score and return top recommendations
-        scored_foods.sort(key=lambda x: x['recommendation_score'], reverse=True)
-        return scored_foods[:max_recommendations]
+        return recommendations
     
-    def _calculate_advanced_food_score(self, food: FoodItem, profile: Dict, meal_type: str, preference_score: float) -> float:
-        """Calculate advanced recommendation score using multiple factors"""
+    def _build_scoring_context(self, profile: Dict, meal_type: str, recent_cuisines: Set[str]) -> FoodScoringContext:
+        """Read the profile values used to score and explain every candidate once per request"""
         
-        score = 0.0
+        nutritional_profile = profile['nutritional_profile']
+        goals = nutritional_profile['goals']
+        current = nutritional_profile['current_intake']
+        cooking_profile = profile['cooking_profile']
         
-        # 1. Basic preference score (30% weight)
-        score += preference_score * 0.3
+        return FoodScoringContext(
+            meal_type=meal_type,
+            cuisine_scores={
+                cuisine: prefs['preference_score']
+                for cuisine, prefs in profile['basic_preferences']['cuisine_preferences'].items()
+            },
+            protein_deficit=bool(goals) and goals['target_protein'] > current['protein'],
+            fiber_deficit=bool(goals) and goals.get('target_fiber', DEFAULT_TARGET_FIBER_G) > current['fiber'],
+            skill_level=cooking_profile['skill_level'],
+            budget_range=cooking_profile['budget_range'],
+            variety_seeking=profile['behavioral_patterns']['variety_seeking'],
+            recent_cuisines=recent_cuisines
+        )
+    
+    def _calculate_advanced_food_scores(self, foods: List[Row], ctx: FoodScoringContext) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate advanced recommendation scores and reason bitmasks for a batch of candidate foods"""
         
-        # 2. Cuisine preference alignment (20% weight)
-        basic_prefs = profile['basic_preferences']
-        cuisine_prefs = basic_prefs['cuisine_preferences']
-        if food.cuisine_type in cuisine_prefs:
-            cuisine_score = cuisine_prefs[food.cuisine_type]['preference_score']
-            score += cuisine_score * 0.2
+        count = len(foods)
+        reason_masks = np.zeros(count, dtype=np.int64)
         
-        # 3. Nutritional alignment (20% weight)
-        nutritional_profile = profile['nutritional_profile']
-        if nutritional_profile['goals']:
-            goals = nutritional_profile['goals']
-            current = nutritional_profile['current_intake']
-            
-            # Check if food helps meet nutritional goals
-            if goals['target_protein'] > current['protein'] and food.protein_g > 15:
-                score += 0.1
-            if goals['target_fiber'] > current['fiber'] and food.fiber_g > 5:
-                score += 0.1
+        # Every factor is applied to the score array in place
+        # 1. Basic preference score (30% weight)
+        scores = np.fromiter((food.preference_score for food in foods), dtype=np.float64, count=count)
+        scores *= 0.3
         
-        # 4. Cooking profile alignment (15% weight)
-        cooking_profile = profile['cooking_profile']
-        if cooking_profile['skill_level'] == 'beginner' and food.prep_complexity == 'low':
-            score += 0.15
-        elif cooking_profile['skill_level'] == 'advanced' and food.prep_complexity == 'high':
-            score += 0.15
-        else:
-            score += 0.075  # Partial alignment
+        # 2. Cuisine preference alignment (20% weight)
+        cuisine_scores = np.fromiter(
+            (ctx.cuisine_scores.get(food.cuisine_type, 0.0) for food in foods), dtype=np.float64, count=count
+        )
+        np.bitwise_or(reason_masks, LOVES_CUISINE, out=reason_masks, where=cuisine_scores > 0.7)
+        cuisine_scores *= 0.2
+        scores += cuisine_scores
+        
+        # 3. Nutritional alignment (20% weight): check if food helps meet nutritional goals
+        if ctx.protein_deficit:
+            high_protein = np.fromiter((food.protein_g for food in foods), dtype=np.float64, count=count) > 15
+            np.add(scores, 0.1, out=scores, where=high_protein)
+            np.bitwise_or(reason_masks, HIGH_PROTEIN_FIT, out=reason_masks, where=high_protein)
+        if ctx.fiber_deficit:
+            high_fiber = np.fromiter((food.fiber_g for food in foods), dtype=np.float64, count=count) > 5
+            np.add(scores, 0.1, out=scores, where=high_fiber)
+            np.bitwise_or(reason_masks, HIGH_FIBER_FIT, out=reason_masks, where=high_fiber)
+        
+        # 4. Cooking profile alignment (15% weight, partial alignment otherwise)
+        skill_bonus = np.fromiter((
+            SKILL_PREP_BONUS.get((ctx.skill_level, food.prep_complexity), 0.075) for food in foods
+        ), dtype=np.float64, count=count)
+        scores += skill_bonus
+        if ctx.skill_level in SKILL_REASON_BITS:
+            np.bitwise_or(reason_masks, SKILL_REASON_BITS[ctx.skill_level], out=reason_masks, where=skill_bonus > 0.075)
+        
+        # Budget alignment only feeds the reasons, not the score
+        if ctx.budget_range == 'low':
+            cost = np.fromiter((food.cost for food in foods), dtype=np.float64, count=count)
+            np.bitwise_or(reason_masks, BUDGET_LOW_MATCH, out=reason_masks, where=cost <= 3)
+        elif ctx.budget_range == 'high':
+            cost = np.fromiter((food.cost for food in foods), dtype=np.float64, count=count)
+            np.bitwise_or(reason_masks, BUDGET_HIGH_MATCH, out=reason_masks, where=cost >= 8)
         
         # 5. Behavioral pattern alignment (10% weight)
-        behavioral_patterns = profile['behavioral_patterns']
-        if behavioral_patterns['variety_seeking'] > 0.7 and food.cuisine_type not in [f.cuisine_type for f in self._get_recent_foods(user.id, days=14)]:
-            score += 0.1
+        if ctx.variety_seeking > 0.7:
+            new_cuisine = np.fromiter((food.cuisine_type not in ctx.recent_cuisines for food in foods), dtype=bool, count=count)
+            np.add(scores, 0.1, out=scores, where=new_cuisine)
         
         # 6. Meal type appropriateness (5% weight)
-        meal_appropriateness = self._calculate_meal_appropriateness(food, meal_type)
-        score += meal_appropriateness * 0.05
+        meal_appropriateness = np.fromiter(
+            (self._calculate_meal_appropriateness(food.name, ctx.meal_type) for food in foods), dtype=np.float64, count=count
+        )
+        meal_appropriateness *= 0.05
+        scores += meal_appropriateness
         
-        return min(1.0, score)
+        return np.minimum(scores, 1.0, out=scores), reason_masks
     
-    def _generate_recommendation_reasons(self, food: FoodItem, profile: Dict, meal_type: str) -> List[str]:
-        """Generate human-readable reasons for recommendations"""
-        
-        reasons = []
+    def _generate_recommendation_reasons(self, reason_mask: int, cuisine_type: str) -> List[str]:
+        """Generate human-readable reasons for recommendations from the scorer's reason bitmask"""
         
-        # Cuisine preference
-        basic_prefs = profile['basic_preferences']
-        cuisine_prefs = basic_prefs['cuisine_preferences']
-        if food.cuisine_type in cuisine_prefs:
-            pref_score = cuisine_prefs[food.cuisine_type]['preference_score']
-            if pref_score > 0.7:
-                reasons.append(f"Matches your love for {food.cuisine_type} cuisine")
-        
-        # Nutritional benefits
-        nutritional_profile = profile['nutritional_profile']
-        if nutritional_profile['goals']:
-            goals = nutritional_profile['goals']
-            current = nutritional_profile['current_intake']
-            
-            if goals['target_protein'] > current['protein'] and food.protein_g > 15:
-                reasons.append("High in protein - helps meet your goals")
-            if goals['target_fiber'] > current['fiber'] and food.fiber_g > 5:
-                reasons.append("Rich in fiber - supports your nutrition goals")
-        
-        # Cooking skill alignment
-        cooking_profile = profile['cooking_profile']
-        if cooking_profile['skill_level'] == 'beginner' and food.prep_complexity == 'low':
-            reasons.append("Perfect for your cooking skill level")
-        elif cooking_profile['skill_level'] == 'advanced' and food.prep_complexity == 'high':
-            reasons.append("Challenging recipe to showcase your skills")
-        
-        # Budget alignment
-        budget_range = cooking_profile['budget_range']
-        if budget_range == 'low' and food.cost <= 3:
-            reasons.append("Budget-friendly option")
-        elif budget_range == 'high' and food.cost >= 8:
-            reasons.append("Premium ingredient for special occasions")
+        reasons = [reason.format(cuisine=cuisine_type) for bit, reason in REASON_TABLE if reason_mask & bit]
         
         # Default reason
         if not reasons:
@@ -823,15 +1023,11 @@ class IntelligentRecommendationEngine:
         
         suggestions = []
         
-        # Get all available cuisines
-        available_cuisines = self.db.query(FoodItem.cuisine_type).distinct().all()
-        available_cuisines = [c[0] for c in available_cuisines if c[0]]
-        
         # Suggest based on variety seeking tendency
         if behavioral_patterns['variety_seeking'] > 0.6:
             # Suggest unexplored cuisines
-            explored_cuisines = set(basic_prefs['cuisine_preferences'].keys())
-            unexplored = [c for c in available_cuisines if c not in explored_cuisines]
+            explored_cuisines = basic_prefs['cuisine_preferences'].keys()
+            unexplored = [c for c in self._get_available_cuisines() if c not in explored_cuisines]
             
             for cuisine in unexplored[:3]:
                 suggestions.append({
@@ -853,6 +1049,17 @@ class IntelligentRecommendationEngine:
         
         return suggestions
     
+    def _get_available_cuisines(self) -> Tuple[str, ...]:
+        """Get all distinct food cuisines, cached for a few minutes"""
+        
+        cached = _available_cuisines_cache.get('cuisines')
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        cuisines = tuple(cuisine for (cuisine,) in self.db.query(FoodItem.cuisine_type).distinct() if cuisine)
+        _available_cuisines_cache['cuisines'] = (time.monotonic() + AVAILABLE_CUISINES_TTL_SECONDS, cuisines)
+        return cuisines
+    
     def _generate_meal_planning_insights(self, profile: Dict) -> Dict:
         """Generate insights for better meal planning"""
         
@@ -915,12 +1122,13 @@ class IntelligentRecommendationEngine:
                 })
             
             # Fiber recommendations
-            if goals['target_fiber'] > current['fiber']:
+            target_fiber = goals.get('target_fiber', DEFAULT_TARGET_FIBER_G)
+            if target_fiber > current['fiber']:
                 guidance['recommendations'].append({
                     'nutrient': 'fiber',
                     'current': current['fiber'],
-                    'target': goals['target_fiber'],
-                    'message': f"Increase fiber intake by {goals['target_fiber'] - current['fiber']:.1f}g per day"
+                    'target': target_fiber,
+                    'message': f"Increase fiber intake by {target_fiber - current['fiber']:.1f}g per day"
                 })
         
         return guidance
@@ -962,57 +1170,40 @@ class IntelligentRecommendationEngine:
         
         return insights
     
-    def _get_recent_foods(self, user_id: int, days: int = 7) -> List[int]:
-        """Get recently consumed food IDs"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        recent_meals = self.db.query(MealLog.food_item_id).filter(
-            and_(
-                MealLog.user_id == user_id,
-                MealLog.logged_at >= cutoff_date
+    def _get_recent_foods(self, user_id: int, days: int = 7, include_cuisines: bool = False):
+        """Get recently consumed food IDs, and optionally the set of their cuisines"""
+        cache_key = (user_id, days)
+        if cache_key not in self._recent_foods_cache:
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            
+            recent_meals = self.db.query(MealLog.food_item_id, FoodItem.cuisine_type).outerjoin(
+                FoodItem, FoodItem.id == MealLog.food_item_id
+            ).filter(
+                and_(
+                    MealLog.user_id == user_id,
+                    MealLog.logged_at >= cutoff_date
+                )
+            ).distinct().all()
+            
+            self._recent_foods_cache[cache_key] = (
+                [food_id for food_id, _ in recent_meals],
+                {cuisine_type for _, cuisine_type in recent_meals if cuisine_type is not None}
             )
-        ).distinct().all()
         
-        return [meal[0] for meal in recent_meals]
+        food_ids, cuisines = self._recent_foods_cache[cache_key]
+        return (food_ids, cuisines) if include_cuisines else food_ids
     
-    def _calculate_meal_appropriateness(self, food: FoodItem, meal_type: str) -> float:
-        """Calculate how appropriate a food is for a specific meal type"""
-        
-        food_name_lower = food.name.lower()
-        
-        appropriateness_map = {
-            'breakfast': {
-                'high': ['oats', 'eggs', 'yogurt', 'fruit', 'cereal', 'toast', 'pancake', 'smoothie'],
-                'medium': ['nuts', 'juice', 'cheese'],
-                'low': ['curry', 'fried rice', 'pizza', 'pasta']
-            },
-            'lunch': {
-                'high': ['salad', 'sandwich', 'soup', 'rice', 'quinoa', 'curry', 'stir fry'],
-                'medium': ['pasta', 'noodles', 'wrap'],
-                'low': ['dessert', 'cake', 'ice cream', 'cereal']
-            },
-            'dinner': {
-                'high': ['curry', 'stir fry', 'grilled', 'roasted', 'soup', 'pasta', 'rice'],
-                'medium': ['salad', 'sandwich'],
-                'low': ['cereal', 'toast', 'fruit', 'smoothie']
-            },
-            'snack': {
-                'high': ['nuts', 'fruit', 'yogurt', 'crackers', 'cheese'],
-                'medium': ['smoothie', 'juice'],
-                'low': ['curry', 'fried rice', 'pasta', 'heavy meal']
-            }
-        }
-        
-        meal_categories = appropriateness_map.get(meal_type, {})
-        
-        for category, keywords in meal_categories.items():
-            for keyword in keywords:
-                if keyword in food_name_lower:
-                    if category == 'high':
-                        return 1.0
-                    elif category == 'medium':
-                        return 0.6
-                    elif category == 'low':
-                        return 0.2
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _calculate_meal_appropriateness(food_name: str, meal_type: str) -> float:
+        """Calculate how appropriate a food (by name) is for a specific meal type"""
+        
+        # Lowercasing happens here so cached names skip it entirely
+        food_name_lower = food_name.lower()
+        
+        # Categories are checked in priority order: high, medium, low
+        for pattern, score in MEAL_APPROPRIATENESS_PATTERNS.get(meal_type, ()):
+            if pattern.search(food_name_lower):
+                return score
         
         return 0.5  # Default appropriateness
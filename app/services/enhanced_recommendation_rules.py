@@ -6,9 +6,16 @@ import json
 import logging
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from functools import lru_cache
+from sqlalchemy.orm import Query, Session
+from sqlalchemy import Date, Integer, and_, cast, distinct, event, extract, func
+from sqlalchemy.engine import Row
+import numpy as np
+import heapq
 import math
+import re
+import threading
+import time
 
 from app.database import User, FoodItem, MealLog, FoodRating, Goal
 from app.models.enhanced_models import (
@@ -18,6 +25,178 @@ from app.models.enhanced_models import (
 
 logger = logging.getLogger(__name__)
 
+# Keys of the per-day totals in the nutritional patterns, in MealLog column order
+DAILY_NUTRIENT_KEYS = ('calories', 'protein', 'carbs', 'fat')
+
+# Breakfast, lunch and dinner hour windows (inclusive) used for meal regularity
+MEAL_HOUR_WINDOWS = ((6, 10), (11, 14), (17, 21))
+
+SEASONS_BY_MONTH = {
+    12: 'winter', 1: 'winter', 2: 'winter',
+    3: 'spring', 4: 'spring', 5: 'spring',
+    6: 'summer', 7: 'summer', 8: 'summer',
+    9: 'fall', 10: 'fall', 11: 'fall'
+}
+
+# Recommendation reason bits recorded by the scorers
+REASON_PREFERRED_CUISINE = 1 << 0
+REASON_VARIETY_CHOICE = 1 << 1
+REASON_UNUSUAL_CUISINE = 1 << 2
+REASON_RECENT_CUISINE = 1 << 3
+REASON_HIGH_PROTEIN = 1 << 4
+REASON_HIGH_FIBER = 1 << 5
+REASON_LIGHT_CALORIES = 1 << 6
+REASON_BALANCED_CALORIES = 1 << 7
+REASON_DIABETIC_FRIENDLY = 1 << 8
+REASON_HEART_HEALTHY = 1 << 9
+REASON_BEGINNER_SKILL = 1 << 10
+REASON_INTERMEDIATE_SKILL = 1 << 11
+REASON_ADVANCED_SKILL = 1 << 12
+REASON_LOW_BUDGET = 1 << 13
+REASON_MEDIUM_BUDGET = 1 << 14
+REASON_HIGH_BUDGET = 1 << 15
+REASON_MEAL_PREP = 1 << 16
+REASON_NEW_CUISINE = 1 << 17
+REASON_ENJOYED_BEFORE = 1 << 18
+REASON_DISLIKED_BEFORE = 1 << 19
+REASON_MEAL_TYPE_HABIT = 1 << 20
+REASON_SEASON_PREFERRED = 1 << 21
+REASON_SEASON_AVOIDED = 1 << 22
+REASON_WARMING = 1 << 23
+REASON_REFRESHING = 1 << 24
+REASON_SHAREABLE = 1 << 25
+REASON_FAMILY_ECONOMICAL = 1 << 26
+REASON_MEAL_TYPE_HIGH = 1 << 27
+REASON_MEAL_TYPE_MEDIUM = 1 << 28
+REASON_MEAL_TYPE_LOW = 1 << 29
+
+# Reason strings per bit, in the order the scorers report them
+RECOMMENDATION_REASONS = (
+    (REASON_PREFERRED_CUISINE, "Matches your preferred {cuisine} cuisine"),
+    (REASON_VARIETY_CHOICE, "Good variety choice"),
+    (REASON_UNUSUAL_CUISINE, "Different from your usual preferences"),
+    (REASON_RECENT_CUISINE, "You've been enjoying {cuisine} cuisine recently"),
+    (REASON_HIGH_PROTEIN, "High in protein - helps meet your goals"),
+    (REASON_HIGH_FIBER, "Rich in fiber - supports your nutrition goals"),
+    (REASON_LIGHT_CALORIES, "Light option for your calorie goals"),
+    (REASON_BALANCED_CALORIES, "Well-balanced for your calorie goals"),
+    (REASON_DIABETIC_FRIENDLY, "Diabetic-friendly option"),
+    (REASON_HEART_HEALTHY, "Heart-healthy choice"),
+    (REASON_BEGINNER_SKILL, "Perfect for your skill level"),
+    (REASON_INTERMEDIATE_SKILL, "Good match for your cooking skills"),
+    (REASON_ADVANCED_SKILL, "Challenging recipe to showcase your skills"),
+    (REASON_LOW_BUDGET, "Budget-friendly option"),
+    (REASON_MEDIUM_BUDGET, "Good value for money"),
+    (REASON_HIGH_BUDGET, "Premium ingredient for special occasions"),
+    (REASON_MEAL_PREP, "Great for meal prep"),
+    (REASON_NEW_CUISINE, "New cuisine to explore for variety"),
+    (REASON_ENJOYED_BEFORE, "You've enjoyed this food before"),
+    (REASON_DISLIKED_BEFORE, "You didn't like this food previously"),
+    (REASON_MEAL_TYPE_HABIT, "Matches your {meal_type} preferences"),
+    (REASON_SEASON_PREFERRED, "Perfect for {season} season"),
+    (REASON_SEASON_AVOIDED, "Not ideal for {season} season"),
+    (REASON_WARMING, "Warming food for winter"),
+    (REASON_REFRESHING, "Refreshing food for summer"),
+    (REASON_SHAREABLE, "Great for sharing with others"),
+    (REASON_FAMILY_ECONOMICAL, "Economical for family meals"),
+    (REASON_MEAL_TYPE_HIGH, "Perfect for {meal_type}"),
+    (REASON_MEAL_TYPE_MEDIUM, "Good for {meal_type}"),
+    (REASON_MEAL_TYPE_LOW, "Not ideal for {meal_type}")
+)
+
+# Name keywords of foods suited to a season, with the reason bit set for them
+SEASONAL_KEYWORDS = {
+    'winter': (('soup', 'stew', 'curry', 'hot'), REASON_WARMING),
+    'summer': (('salad', 'fresh', 'cold', 'smoothie'), REASON_REFRESHING)
+}
+
+# Name keywords of dishes that are good for sharing with others
+SHARING_KEYWORDS = ('curry', 'pasta', 'casserole', 'stew')
+
+# Name keywords per meal type and appropriateness category
+MEAL_TYPE_APPROPRIATENESS = {
+    'breakfast': {
+        'high': ['oats', 'eggs', 'yogurt', 'fruit', 'cereal', 'toast', 'pancake', 'smoothie'],
+        'medium': ['nuts', 'juice', 'cheese'],
+        'low': ['curry', 'fried rice', 'pizza', 'pasta']
+    },
+    'lunch': {
+        'high': ['salad', 'sandwich', 'soup', 'rice', 'quinoa', 'curry', 'stir fry'],
+        'medium': ['pasta', 'noodles', 'wrap'],
+        'low': ['dessert', 'cake', 'ice cream', 'cereal']
+    },
+    'dinner': {
+        'high': ['curry', 'stir fry', 'grilled', 'roasted', 'soup', 'pasta', 'rice'],
+        'medium': ['salad', 'sandwich'],
+        'low': ['cereal', 'toast', 'fruit', 'smoothie']
+    },
+    'snack': {
+        'high': ['nuts', 'fruit', 'yogurt', 'crackers', 'cheese'],
+        'medium': ['smoothie', 'juice'],
+        'low': ['curry', 'fried rice', 'pasta', 'heavy meal']
+    }
+}
+
+# Score and reason bit for each meal type appropriateness category
+MEAL_TYPE_CATEGORY_SCORES = {
+    'high': (1.0, REASON_MEAL_TYPE_HIGH),
+    'medium': (0.6, REASON_MEAL_TYPE_MEDIUM),
+    'low': (0.2, REASON_MEAL_TYPE_LOW)
+}
+
+def _keyword_pattern(keywords) -> re.Pattern:
+    """Compile keywords into one substring alternation"""
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+# One compiled alternation per keyword set, so each food name is scanned once per set
+SEASONAL_PATTERNS = {
+    season: (_keyword_pattern(keywords), reason) for season, (keywords, reason) in SEASONAL_KEYWORDS.items()
+}
+SHARING_PATTERN = _keyword_pattern(SHARING_KEYWORDS)
+MEAL_TYPE_PATTERNS = {
+    meal_type: tuple((category, _keyword_pattern(keywords)) for category, keywords in categories.items())
+    for meal_type, categories in MEAL_TYPE_APPROPRIATENESS.items()
+}
+
+@lru_cache(maxsize=4096)
+def _classify_food_name(name_lower: str) -> frozenset:
+    """Classify a lowercased food name once into its seasons, 'sharing' and (meal type, category) keyword classes"""
+    classes = {season for season, (pattern, _) in SEASONAL_PATTERNS.items() if pattern.search(name_lower)}
+    if SHARING_PATTERN.search(name_lower):
+        classes.add('sharing')
+    classes.update(
+        (meal_type, category)
+        for meal_type, categories in MEAL_TYPE_PATTERNS.items()
+        for category, pattern in categories if pattern.search(name_lower)
+    )
+    return frozenset(classes)
+
+# Columns of the candidate foods the scorers and the response read
+CANDIDATE_FOOD_COLUMNS = (
+    FoodItem.id, FoodItem.name, FoodItem.cuisine_type, FoodItem.calories, FoodItem.protein_g,
+    FoodItem.carbs_g, FoodItem.fat_g, FoodItem.fiber_g, FoodItem.cost, FoodItem.prep_complexity,
+    FoodItem.diabetic_friendly, FoodItem.hypertension_friendly
+)
+
+# Numeric candidate columns the scorers read, extracted once per request into a feature matrix
+FOOD_FEATURE_COLUMNS = ('calories', 'protein_g', 'fiber_g', 'cost', 'diabetic_friendly', 'hypertension_friendly')
+
+# Per-process cache of each user's meal history patterns, as (expires_at, patterns).
+# Profile rows are re-read on every request; only the pattern analysis is cached.
+PATTERNS_CACHE_TTL_SECONDS = 300
+PATTERNS_CACHE_MAX_SIZE = 10000
+_patterns_cache: Dict[int, tuple] = {}
+
+# Guards every write to the patterns cache; request threads and ORM listeners evict concurrently
+_cache_lock = threading.Lock()
+
+@event.listens_for(MealLog, "after_insert")
+@event.listens_for(MealLog, "after_update")
+@event.listens_for(MealLog, "after_delete")
+def _invalidate_patterns(mapper, connection, target):
+    with _cache_lock:
+        _patterns_cache.pop(target.user_id, None)
+
 class EnhancedRecommendationRules:
     """Enhanced recommendation rules with sophisticated logic"""
     
@@ -39,12 +218,19 @@ class EnhancedRecommendationRules:
             # Get candidate foods
             candidate_foods = self._get_candidate_foods(user_profile, context)
             
-            # Score foods using enhanced rules
-            scored_foods = []
-            for food in candidate_foods:
-                score, reasons = self._calculate_enhanced_score(food, user_profile, context)
-                
-                scored_foods.append({
+            # Score all candidate foods at once using enhanced rules, reading the clock once per request
+            current_season = self._get_current_season()
+            scores, reason_masks = self._calculate_enhanced_scores(candidate_foods, user_profile, context, current_season)
+            scores = scores.tolist()
+            reason_masks = reason_masks.tolist()
+            
+            # Keep the top recommendations (nlargest is stable, like sort + slice) and only describe those
+            top_indices = heapq.nlargest(max_recommendations, range(len(scores)), key=scores.__getitem__)
+            
+            recommendations = []
+            for index in top_indices:
+                food = candidate_foods[index]
+                recommendations.append({
                     'food_id': food.id,
                     'name': food.name,
                     'cuisine_type': food.cuisine_type,
@@ -54,16 +240,15 @@ class EnhancedRecommendationRules:
                     'fat_g': food.fat_g,
                     'cost': food.cost,
                     'prep_complexity': food.prep_complexity,
-                    'recommendation_score': score,
-                    'recommendation_reasons': reasons,
-                    'confidence_level': self._calculate_confidence_level(score, user_profile)
+                    'recommendation_score': scores[index],
+                    'recommendation_reasons': self._generate_recommendation_reasons(
+                        reason_masks[index], food.cuisine_type, meal_type, current_season
+                    ),
+                    'confidence_level': self._calculate_confidence_level(scores[index], user_profile)
                 })
             
-            # Sort by score and return top recommendations
-            scored_foods.sort(key=lambda x: x['recommendation_score'], reverse=True)
-            
             return {
-                'recommendations': scored_foods[:max_recommendations],
+                'recommendations': recommendations,
                 'user_profile_summary': self._get_profile_summary(user_profile),
                 'context_used': context,
                 'total_candidates': len(candidate_foods),
@@ -77,118 +262,167 @@ class EnhancedRecommendationRules:
     def _get_comprehensive_user_profile(self, user_id: int) -> Dict[str, Any]:
         """Get comprehensive user profile with all data"""
         
-        # Get basic user data
-        user = self.db.query(User).filter(User.id == user_id).first()
-        
-        # Get cooking pattern
-        cooking_pattern = self.db.query(UserCookingPattern).filter(
-            UserCookingPattern.user_id == user_id
-        ).first()
-        
-        # Get nutrition goals
-        nutrition_goals = self.db.query(UserNutritionGoals).filter(
-            UserNutritionGoals.user_id == user_id,
-            UserNutritionGoals.is_active == True
-        ).first()
+        # Get basic user data with cooking pattern, active nutrition goals and social cooking data in one round-trip
+        profile_row = self.db.query(User, UserCookingPattern, UserNutritionGoals, SocialCookingData).outerjoin(
+            UserCookingPattern, UserCookingPattern.user_id == User.id
+        ).outerjoin(
+            UserNutritionGoals, and_(
+                UserNutritionGoals.user_id == User.id,
+                UserNutritionGoals.is_active == True
+            )
+        ).outerjoin(
+            SocialCookingData, SocialCookingData.user_id == User.id
+        ).filter(User.id == user_id).first()
+        user, cooking_pattern, nutrition_goals, social_cooking = profile_row or (None, None, None, None)
         
-        # Get social cooking data
-        social_cooking = self.db.query(SocialCookingData).filter(
-            SocialCookingData.user_id == user_id
-        ).first()
+        # Parse the stored health conditions once for the candidate filters and the scorers
+        health_conditions = {}
+        if user and user.health_conditions:
+            health_conditions = self._parse_health_conditions(user.health_conditions) if isinstance(user.health_conditions, str) else user.health_conditions
         
         # Get seasonal preferences
         seasonal_prefs = self.db.query(SeasonalPreference).filter(
             SeasonalPreference.user_id == user_id
         ).all()
         
-        # Get recent meal history for analysis
-        recent_meals = self.db.query(MealLog).join(FoodItem).filter(
-            and_(
-                MealLog.user_id == user_id,
-                MealLog.logged_at >= datetime.utcnow() - timedelta(days=30)
-            )
-        ).all()
-        
         # Get food preferences
         food_preferences = self.db.query(FoodPreferenceLearning).filter(
             FoodPreferenceLearning.user_id == user_id
         ).all()
         
         # Analyze patterns
-        patterns = self._analyze_user_patterns(recent_meals, food_preferences)
+        patterns = self._get_user_patterns(user_id, food_preferences)
         
         return {
             'user': user,
+            'health_conditions': health_conditions,
             'cooking_pattern': cooking_pattern,
             'nutrition_goals': nutrition_goals,
             'social_cooking': social_cooking,
             'seasonal_preferences': {p.season: p for p in seasonal_prefs},
+            'seasonal_food_sets': {
+                p.season: (
+                    frozenset(f.lower() for f in p.preferred_foods or []),
+                    frozenset(f.lower() for f in p.avoided_foods or [])
+                )
+                for p in seasonal_prefs
+            },
             'patterns': patterns,
-            'recent_meals': recent_meals,
             'food_preferences': {fp.food_item_id: fp for fp in food_preferences}
         }
     
-    def _analyze_user_patterns(self, recent_meals: List[MealLog], 
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _parse_health_conditions(health_conditions: str) -> Dict[str, Any]:
+        """Parse a stored health conditions JSON string; the result is shared, so callers only read it"""
+        return json.loads(health_conditions)
+    
+    def _get_user_patterns(self, user_id: int, food_preferences: List[FoodPreferenceLearning]) -> Dict[str, Any]:
+        """Get the user's meal history patterns, reusing a fresh cached analysis"""
+        
+        cached = _patterns_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        # Recent meal history for analysis; the aggregates are computed by the database
+        recent_meals = self.db.query(MealLog).join(FoodItem, FoodItem.id == MealLog.food_item_id).filter(
+            and_(
+                MealLog.user_id == user_id,
+                MealLog.logged_at >= datetime.utcnow() - timedelta(days=30)
+            )
+        )
+        
+        patterns = self._analyze_user_patterns(recent_meals, food_preferences)
+        
+        # Evict the oldest entry once the cache is full
+        with _cache_lock:
+            if user_id not in _patterns_cache and len(_patterns_cache) >= PATTERNS_CACHE_MAX_SIZE:
+                _patterns_cache.pop(next(iter(_patterns_cache)), None)
+            _patterns_cache[user_id] = (time.monotonic() + PATTERNS_CACHE_TTL_SECONDS, patterns)
+        
+        return patterns
+    
+    def _analyze_user_patterns(self, recent_meals: Query, 
                              food_preferences: List[FoodPreferenceLearning]) -> Dict[str, Any]:
         """Analyze user patterns from recent data"""
         
-        if not recent_meals:
+        # Analyze meal timing patterns: meals logged at each hour of the day
+        # EXTRACT is numeric on PostgreSQL, so cast it to index the histogram on every dialect
+        hour = cast(extract('hour', MealLog.logged_at), Integer)
+        hour_counts = np.zeros(24, dtype=np.int64)
+        for meal_hour, meals in recent_meals.with_entities(hour, func.count()).group_by(hour):
+            hour_counts[meal_hour] = meals
+        
+        meal_count = int(hour_counts.sum())
+        if not meal_count:
             return self._get_default_patterns()
         
+        meal_times = np.repeat(np.arange(24), hour_counts)
+        breakfast_mask = (meal_times >= 6) & (meal_times <= 10)
+        lunch_mask = (meal_times >= 11) & (meal_times <= 14)
+        dinner_mask = (meal_times >= 17) & (meal_times <= 21)
+        
         # Analyze cuisine preferences
-        cuisine_counts = {}
-        for meal in recent_meals:
-            if meal.food_item and meal.food_item.cuisine_type:
-                cuisine = meal.food_item.cuisine_type
-                cuisine_counts[cuisine] = cuisine_counts.get(cuisine, 0) + 1
-        
-        # Analyze meal timing patterns
-        meal_times = [meal.logged_at.hour for meal in recent_meals]
-        meal_types = [meal.meal_type for meal in recent_meals]
-        
-        # Analyze nutritional patterns
-        daily_nutrition = {}
-        for meal in recent_meals:
-            date = meal.logged_at.date()
-            if date not in daily_nutrition:
-                daily_nutrition[date] = {'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0}
-            
-            daily_nutrition[date]['calories'] += meal.calories
-            daily_nutrition[date]['protein'] += meal.protein
-            daily_nutrition[date]['carbs'] += meal.carbs
-            daily_nutrition[date]['fat'] += meal.fat
+        cuisine_counts = dict(
+            recent_meals.with_entities(FoodItem.cuisine_type, func.count())
+            .filter(FoodItem.cuisine_type != '')
+            .group_by(FoodItem.cuisine_type)
+            .all()
+        )
+        
+        meal_type_counts = dict(
+            recent_meals.with_entities(MealLog.meal_type, func.count()).group_by(MealLog.meal_type).all()
+        )
+        
+        # Analyze nutritional patterns: per-day totals
+        day = func.date(MealLog.logged_at, type_=Date)
+        daily_nutrition = {
+            meal_day: dict(zip(DAILY_NUTRIENT_KEYS, totals))
+            for meal_day, *totals in recent_meals.with_entities(
+                day, func.sum(MealLog.calories), func.sum(MealLog.protein),
+                func.sum(MealLog.carbs), func.sum(MealLog.fat)
+            ).group_by(day).order_by(day)
+        }
         
         # Calculate variety score
-        unique_foods = len(set(meal.food_item_id for meal in recent_meals))
-        variety_score = unique_foods / len(recent_meals) if recent_meals else 0
+        distinct_foods = recent_meals.with_entities(func.count(distinct(MealLog.food_item_id))).scalar()
+        variety_score = distinct_foods / meal_count
         
         # Calculate regularity score
-        meal_regularity = self._calculate_meal_regularity(meal_times)
+        meal_regularity = self._calculate_meal_regularity(hour_counts)
         
         return {
             'cuisine_preferences': cuisine_counts,
+            'recent_cuisines': frozenset(cuisine_counts),
             'meal_timing_patterns': {
-                'breakfast_hours': [h for h in meal_times if 6 <= h <= 10],
-                'lunch_hours': [h for h in meal_times if 11 <= h <= 14],
-                'dinner_hours': [h for h in meal_times if 17 <= h <= 21],
-                'snack_hours': [h for h in meal_times if h not in range(6, 11) and h not in range(11, 15) and h not in range(17, 22)]
+                'breakfast_hours': meal_times[breakfast_mask].tolist(),
+                'lunch_hours': meal_times[lunch_mask].tolist(),
+                'dinner_hours': meal_times[dinner_mask].tolist(),
+                'snack_hours': meal_times[~(breakfast_mask | lunch_mask | dinner_mask)].tolist()
             },
             'meal_type_distribution': {
-                'breakfast': meal_types.count('breakfast'),
-                'lunch': meal_types.count('lunch'),
-                'dinner': meal_types.count('dinner'),
-                'snack': meal_types.count('snack')
+                meal_type: meal_type_counts.get(meal_type, 0)
+                for meal_type in ('breakfast', 'lunch', 'dinner', 'snack')
             },
             'nutritional_patterns': daily_nutrition,
             'variety_score': variety_score,
             'meal_regularity': meal_regularity,
-            'total_meals': len(recent_meals)
+            'total_meals': meal_count
         }
     
-    def _get_candidate_foods(self, user_profile: Dict, context: Dict) -> List[FoodItem]:
+    def _get_candidate_foods(self, user_profile: Dict, context: Dict) -> List[Row]:
         """Get candidate foods based on user profile and context"""
         
-        query = self.db.query(FoodItem)
+        query = self._build_candidate_query(user_profile, context)
+        return query.limit(100).all()
+    
+    def _build_candidate_query(self, user_profile: Dict, context: Dict) -> Query:
+        """Build the candidate food query with every profile, context and recency filter"""
+        
+        user_id = user_profile['user'].id
+        
+        # Only the columns the scorers and the response read
+        query = self.db.query(*CANDIDATE_FOOD_COLUMNS)
         
         # Apply filters based on user profile
         cooking_pattern = user_profile.get('cooking_pattern')
@@ -220,13 +454,11 @@ class EnhancedRecommendationRules:
                 query = query.filter(FoodItem.cuisine_type.in_(preferred_cuisines))
         
         # Filter by dietary restrictions
-        user = user_profile.get('user')
-        if user and user.health_conditions:
-            health_conditions = json.loads(user.health_conditions) if isinstance(user.health_conditions, str) else user.health_conditions
-            if health_conditions.get('diabetes'):
-                query = query.filter(FoodItem.diabetic_friendly == True)
-            if health_conditions.get('hypertension'):
-                query = query.filter(FoodItem.hypertension_friendly == True)
+        health_conditions = user_profile.get('health_conditions', {})
+        if health_conditions.get('diabetes'):
+            query = query.filter(FoodItem.diabetic_friendly == True)
+        if health_conditions.get('hypertension'):
+            query = query.filter(FoodItem.hypertension_friendly == True)
         
         # Filter by meal type appropriateness
         meal_type = context.get('meal_type', 'lunch')
@@ -238,301 +470,300 @@ class EnhancedRecommendationRules:
         # Filter out very high sodium items
         query = query.filter(FoodItem.sodium_mg <= 1000)
         
-        # Get recent foods to avoid repetition
-        recent_foods = self._get_recent_foods(user_profile['user'].id, days=7)
-        if recent_foods:
-            query = query.filter(~FoodItem.id.in_(recent_foods))
-        
-        return query.limit(100).all()
+        # Skip foods eaten in the last week to avoid repetition
+        eaten_recently = self.db.query(MealLog.id).filter(
+            MealLog.user_id == user_id,
+            MealLog.logged_at >= datetime.utcnow() - timedelta(days=7),
+            MealLog.food_item_id == FoodItem.id
+        ).exists()
+        return query.filter(~eaten_recently)
     
-    def _calculate_enhanced_score(self, food: FoodItem, user_profile: Dict, context: Dict) -> Tuple[float, List[str]]:
-        """Calculate enhanced recommendation score with detailed reasoning"""
+    def _calculate_enhanced_scores(self, foods: List[Row], user_profile: Dict, context: Dict,
+                                   current_season: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate enhanced recommendation scores and reason bitmasks for a batch of candidate foods"""
+        
+        scores = np.zeros(len(foods), dtype=np.float64)
+        reason_masks = np.zeros(len(foods), dtype=np.int64)
         
-        score = 0.0
-        reasons = []
+        # Lowercase each name once, and look up its keyword classes for the keyword-based scorers
+        names_lower = [food.name.lower() for food in foods]
+        name_classes = [_classify_food_name(name) for name in names_lower]
+        
+        # Numeric food features, shared by the scorers instead of re-reading each row
+        features = self._build_food_features(foods)
         
         # 1. Cuisine preference alignment (25% weight)
-        cuisine_score, cuisine_reasons = self._calculate_cuisine_score(food, user_profile)
-        score += cuisine_score * 0.25
-        reasons.extend(cuisine_reasons)
+        scores += self._calculate_cuisine_scores(foods, user_profile, reason_masks) * 0.25
         
         # 2. Nutritional alignment (20% weight)
-        nutrition_score, nutrition_reasons = self._calculate_nutrition_score(food, user_profile)
-        score += nutrition_score * 0.20
-        reasons.extend(nutrition_reasons)
+        scores += self._calculate_nutrition_scores(features, user_profile, reason_masks) * 0.20
         
         # 3. Cooking profile alignment (15% weight)
-        cooking_score, cooking_reasons = self._calculate_cooking_score(food, user_profile)
-        score += cooking_score * 0.15
-        reasons.extend(cooking_reasons)
+        scores += self._calculate_cooking_scores(foods, features, user_profile, reason_masks) * 0.15
         
         # 4. Behavioral pattern alignment (15% weight)
-        behavior_score, behavior_reasons = self._calculate_behavior_score(food, user_profile, context)
-        score += behavior_score * 0.15
-        reasons.extend(behavior_reasons)
+        scores += self._calculate_behavior_scores(foods, user_profile, context, reason_masks) * 0.15
         
         # 5. Seasonal appropriateness (10% weight)
-        seasonal_score, seasonal_reasons = self._calculate_seasonal_score(food, user_profile)
-        score += seasonal_score * 0.10
-        reasons.extend(seasonal_reasons)
+        scores += self._calculate_seasonal_scores(names_lower, name_classes, user_profile, current_season, reason_masks) * 0.10
         
         # 6. Social cooking alignment (10% weight)
-        social_score, social_reasons = self._calculate_social_score(food, user_profile)
-        score += social_score * 0.10
-        reasons.extend(social_reasons)
+        scores += self._calculate_social_scores(features, name_classes, user_profile, reason_masks) * 0.10
         
         # 7. Meal type appropriateness (5% weight)
-        meal_score, meal_reasons = self._calculate_meal_type_score(food, context.get('meal_type', 'lunch'))
-        score += meal_score * 0.05
-        reasons.extend(meal_reasons)
+        scores += self._calculate_meal_type_scores(name_classes, context.get('meal_type', 'lunch'), reason_masks) * 0.05
         
-        return min(1.0, score), reasons
+        return np.minimum(scores, 1.0, out=scores), reason_masks
+    
+    @staticmethod
+    def _build_food_features(foods: List[Row]) -> Dict[str, np.ndarray]:
+        """Build the candidates x FOOD_FEATURE_COLUMNS matrix and return its columns by name"""
+        matrix = np.array(
+            [[getattr(food, column) for column in FOOD_FEATURE_COLUMNS] for food in foods], dtype=np.float64
+        ).reshape(len(foods), len(FOOD_FEATURE_COLUMNS))
+        return dict(zip(FOOD_FEATURE_COLUMNS, matrix.T))
+    
+    @staticmethod
+    def _add_reason(reason_masks: np.ndarray, mask: np.ndarray, reason: int):
+        """Set a reason bit on every food selected by the mask"""
+        np.bitwise_or(reason_masks, reason, out=reason_masks, where=mask)
     
-    def _calculate_cuisine_score(self, food: FoodItem, user_profile: Dict) -> Tuple[float, List[str]]:
-        """Calculate cuisine preference score"""
+    def _generate_recommendation_reasons(self, reason_mask: int, cuisine_type: Optional[str],
+                                         meal_type: str, season: str) -> List[str]:
+        """Generate human-readable reasons for a recommendation from its reason bitmask"""
+        return [
+            reason.format(cuisine=cuisine_type, meal_type=meal_type, season=season)
+            for bit, reason in RECOMMENDATION_REASONS if reason_mask & bit
+        ]
+    
+    def _calculate_cuisine_scores(self, foods: List[Row], user_profile: Dict, reason_masks: np.ndarray) -> np.ndarray:
+        """Calculate cuisine preference scores"""
         
-        score = 0.0
-        reasons = []
+        count = len(foods)
+        scores = np.zeros(count, dtype=np.float64)
         
         cooking_pattern = user_profile.get('cooking_pattern')
         patterns = user_profile.get('patterns', {})
         
         if cooking_pattern and cooking_pattern.preferred_cuisines:
-            if food.cuisine_type in cooking_pattern.preferred_cuisines:
-                score = 1.0
-                reasons.append(f"Matches your preferred {food.cuisine_type} cuisine")
-            elif 'mixed' in cooking_pattern.preferred_cuisines:
-                score = 0.7
-                reasons.append("Good variety choice")
+            preferred_cuisines = cooking_pattern.preferred_cuisines
+            is_preferred = np.fromiter((food.cuisine_type in preferred_cuisines for food in foods), dtype=bool, count=count)
+            if 'mixed' in preferred_cuisines:
+                other_score, other_reason = 0.7, REASON_VARIETY_CHOICE
             else:
-                score = 0.3
-                reasons.append("Different from your usual preferences")
+                other_score, other_reason = 0.3, REASON_UNUSUAL_CUISINE
+            scores = np.where(is_preferred, 1.0, other_score)
+            reason_masks |= np.where(is_preferred, REASON_PREFERRED_CUISINE, other_reason)
         
         # Check recent cuisine patterns
         cuisine_preferences = patterns.get('cuisine_preferences', {})
-        if food.cuisine_type in cuisine_preferences:
-            frequency = cuisine_preferences[food.cuisine_type] / patterns.get('total_meals', 1)
-            if frequency > 0.3:
-                score = max(score, 0.8)
-                reasons.append(f"You've been enjoying {food.cuisine_type} cuisine recently")
-        
-        return score, reasons
+        total_meals = patterns.get('total_meals', 1)
+        recent_favourites = {cuisine for cuisine, meals in cuisine_preferences.items() if meals / total_meals > 0.3}
+        if recent_favourites:
+            is_recent_favourite = np.fromiter((food.cuisine_type in recent_favourites for food in foods), dtype=bool, count=count)
+            np.maximum(scores, 0.8, out=scores, where=is_recent_favourite)
+            self._add_reason(reason_masks, is_recent_favourite, REASON_RECENT_CUISINE)
+        
+        return scores
     
-    def _calculate_nutrition_score(self, food: FoodItem, user_profile: Dict) -> Tuple[float, List[str]]:
-        """Calculate nutritional alignment score"""
+    def _calculate_nutrition_scores(self, features: Dict[str, np.ndarray], user_profile: Dict,
+                                    reason_masks: np.ndarray) -> np.ndarray:
+        """Calculate nutritional alignment scores"""
         
-        score = 0.0
-        reasons = []
+        count = len(reason_masks)
+        scores = np.zeros(count, dtype=np.float64)
         
         nutrition_goals = user_profile.get('nutrition_goals')
         patterns = user_profile.get('patterns', {})
         
         if nutrition_goals:
             # Check protein alignment
-            if nutrition_goals.target_protein and food.protein_g > 15:
-                score += 0.3
-                reasons.append("High in protein - helps meet your goals")
+            if nutrition_goals.target_protein:
+                high_protein = features['protein_g'] > 15
+                np.add(scores, 0.3, out=scores, where=high_protein)
+                self._add_reason(reason_masks, high_protein, REASON_HIGH_PROTEIN)
             
             # Check fiber alignment
-            if nutrition_goals.target_fiber and food.fiber_g > 5:
-                score += 0.2
-                reasons.append("Rich in fiber - supports your nutrition goals")
+            if nutrition_goals.target_fiber:
+                high_fiber = features['fiber_g'] > 5
+                np.add(scores, 0.2, out=scores, where=high_fiber)
+                self._add_reason(reason_masks, high_fiber, REASON_HIGH_FIBER)
             
             # Check calorie appropriateness
             if nutrition_goals.target_calories:
-                if food.calories < 200:
-                    score += 0.2
-                    reasons.append("Light option for your calorie goals")
-                elif 200 <= food.calories <= 500:
-                    score += 0.3
-                    reasons.append("Well-balanced for your calorie goals")
+                calories = features['calories']
+                light = calories < 200
+                balanced = (calories >= 200) & (calories <= 500)
+                np.add(scores, 0.2, out=scores, where=light)
+                np.add(scores, 0.3, out=scores, where=balanced)
+                self._add_reason(reason_masks, light, REASON_LIGHT_CALORIES)
+                self._add_reason(reason_masks, balanced, REASON_BALANCED_CALORIES)
         
         # Check health conditions
-        user = user_profile.get('user')
-        if user and user.health_conditions:
-            health_conditions = json.loads(user.health_conditions) if isinstance(user.health_conditions, str) else user.health_conditions
-            if health_conditions.get('diabetes') and food.diabetic_friendly:
-                score += 0.2
-                reasons.append("Diabetic-friendly option")
-            if health_conditions.get('hypertension') and food.hypertension_friendly:
-                score += 0.2
-                reasons.append("Heart-healthy choice")
-        
-        return min(1.0, score), reasons
+        health_conditions = user_profile.get('health_conditions', {})
+        if health_conditions.get('diabetes'):
+            diabetic_friendly = features['diabetic_friendly'] == 1
+            np.add(scores, 0.2, out=scores, where=diabetic_friendly)
+            self._add_reason(reason_masks, diabetic_friendly, REASON_DIABETIC_FRIENDLY)
+        if health_conditions.get('hypertension'):
+            hypertension_friendly = features['hypertension_friendly'] == 1
+            np.add(scores, 0.2, out=scores, where=hypertension_friendly)
+            self._add_reason(reason_masks, hypertension_friendly, REASON_HEART_HEALTHY)
+        
+        return np.minimum(scores, 1.0, out=scores)
     
-    def _calculate_cooking_score(self, food: FoodItem, user_profile: Dict) -> Tuple[float, List[str]]:
-        """Calculate cooking profile alignment score"""
+    def _calculate_cooking_scores(self, foods: List[Row], features: Dict[str, np.ndarray], user_profile: Dict,
+                                  reason_masks: np.ndarray) -> np.ndarray:
+        """Calculate cooking profile alignment scores"""
         
-        score = 0.0
-        reasons = []
+        count = len(foods)
+        scores = np.zeros(count, dtype=np.float64)
         
         cooking_pattern = user_profile.get('cooking_pattern')
         
         if cooking_pattern:
+            prep_complexity = np.array([food.prep_complexity for food in foods], dtype=object)
+            low_prep = prep_complexity == 'low'
+            
             # Skill level alignment
             skill_level = cooking_pattern.cooking_skill_level
-            if skill_level == 'beginner' and food.prep_complexity == 'low':
-                score += 0.5
-                reasons.append("Perfect for your skill level")
-            elif skill_level == 'intermediate' and food.prep_complexity in ['low', 'medium']:
-                score += 0.4
-                reasons.append("Good match for your cooking skills")
-            elif skill_level == 'advanced' and food.prep_complexity == 'high':
-                score += 0.5
-                reasons.append("Challenging recipe to showcase your skills")
+            if skill_level == 'beginner':
+                np.add(scores, 0.5, out=scores, where=low_prep)
+                self._add_reason(reason_masks, low_prep, REASON_BEGINNER_SKILL)
+            elif skill_level == 'intermediate':
+                skill_match = low_prep | (prep_complexity == 'medium')
+                np.add(scores, 0.4, out=scores, where=skill_match)
+                self._add_reason(reason_masks, skill_match, REASON_INTERMEDIATE_SKILL)
+            elif skill_level == 'advanced':
+                skill_match = prep_complexity == 'high'
+                np.add(scores, 0.5, out=scores, where=skill_match)
+                self._add_reason(reason_masks, skill_match, REASON_ADVANCED_SKILL)
             
             # Budget alignment
             budget_range = cooking_pattern.budget_range
-            if budget_range == 'low' and food.cost <= 5:
-                score += 0.3
-                reasons.append("Budget-friendly option")
-            elif budget_range == 'medium' and 5 < food.cost <= 15:
-                score += 0.3
-                reasons.append("Good value for money")
-            elif budget_range == 'high' and food.cost > 15:
-                score += 0.3
-                reasons.append("Premium ingredient for special occasions")
+            if budget_range in ('low', 'medium', 'high'):
+                cost = features['cost']
+                if budget_range == 'low':
+                    budget_match, budget_reason = cost <= 5, REASON_LOW_BUDGET
+                elif budget_range == 'medium':
+                    budget_match, budget_reason = (cost > 5) & (cost <= 15), REASON_MEDIUM_BUDGET
+                else:
+                    budget_match, budget_reason = cost > 15, REASON_HIGH_BUDGET
+                np.add(scores, 0.3, out=scores, where=budget_match)
+                self._add_reason(reason_masks, budget_match, budget_reason)
             
             # Meal prep preference
-            if cooking_pattern.meal_prep_preference and food.prep_complexity == 'low':
-                score += 0.2
-                reasons.append("Great for meal prep")
+            if cooking_pattern.meal_prep_preference:
+                np.add(scores, 0.2, out=scores, where=low_prep)
+                self._add_reason(reason_masks, low_prep, REASON_MEAL_PREP)
         
-        return min(1.0, score), reasons
+        return np.minimum(scores, 1.0, out=scores)
     
-    def _calculate_behavior_score(self, food: FoodItem, user_profile: Dict, context: Dict) -> Tuple[float, List[str]]:
-        """Calculate behavioral pattern alignment score"""
+    def _calculate_behavior_scores(self, foods: List[Row], user_profile: Dict, context: Dict, reason_masks: np.ndarray) -> np.ndarray:
+        """Calculate behavioral pattern alignment scores"""
         
-        score = 0.0
-        reasons = []
+        count = len(foods)
+        scores = np.zeros(count, dtype=np.float64)
         
         patterns = user_profile.get('patterns', {})
         food_preferences = user_profile.get('food_preferences', {})
         
         # Variety seeking behavior
         variety_score = patterns.get('variety_score', 0)
-        if variety_score > 0.7 and food.cuisine_type not in [m.food_item.cuisine_type for m in patterns.get('recent_meals', [])]:
-            score += 0.4
-            reasons.append("New cuisine to explore for variety")
+        if variety_score > 0.7:
+            recent_cuisines = patterns.get('recent_cuisines', frozenset())
+            new_cuisine = np.fromiter((food.cuisine_type not in recent_cuisines for food in foods), dtype=bool, count=count)
+            np.add(scores, 0.4, out=scores, where=new_cuisine)
+            self._add_reason(reason_masks, new_cuisine, REASON_NEW_CUISINE)
         
         # Check if user has tried this food before
-        if food.id in food_preferences:
-            preference = food_preferences[food.id]
-            if preference.preference_score > 0.7:
-                score += 0.3
-                reasons.append("You've enjoyed this food before")
-            elif preference.preference_score < 0.3:
-                score -= 0.2
-                reasons.append("You didn't like this food previously")
+        if food_preferences:
+            preference_scores = np.fromiter((
+                food_preferences[food.id].preference_score if food.id in food_preferences else 0.5 for food in foods
+            ), dtype=np.float64, count=count)
+            liked = preference_scores > 0.7
+            disliked = preference_scores < 0.3
+            np.add(scores, 0.3, out=scores, where=liked)
+            np.subtract(scores, 0.2, out=scores, where=disliked)
+            self._add_reason(reason_masks, liked, REASON_ENJOYED_BEFORE)
+            self._add_reason(reason_masks, disliked, REASON_DISLIKED_BEFORE)
         
         # Meal timing patterns
         meal_type = context.get('meal_type', 'lunch')
         meal_type_distribution = patterns.get('meal_type_distribution', {})
         if meal_type_distribution.get(meal_type, 0) > 0:
-            score += 0.3
-            reasons.append(f"Matches your {meal_type} preferences")
+            scores += 0.3
+            reason_masks |= REASON_MEAL_TYPE_HABIT
         
-        return min(1.0, score), reasons
+        return np.minimum(scores, 1.0, out=scores)
     
-    def _calculate_seasonal_score(self, food: FoodItem, user_profile: Dict) -> Tuple[float, List[str]]:
-        """Calculate seasonal appropriateness score"""
+    def _calculate_seasonal_scores(self, names_lower: List[str], name_classes: List[frozenset], user_profile: Dict,
+                                   current_season: str, reason_masks: np.ndarray) -> np.ndarray:
+        """Calculate seasonal appropriateness scores"""
         
-        score = 0.5  # Default neutral score
-        reasons = []
+        count = len(names_lower)
+        scores = np.full(count, 0.5, dtype=np.float64)  # Default neutral score
         
-        current_season = self._get_current_season()
-        seasonal_preferences = user_profile.get('seasonal_preferences', {})
+        seasonal_food_sets = user_profile.get('seasonal_food_sets', {})
         
-        if current_season in seasonal_preferences:
-            season_pref = seasonal_preferences[current_season]
-            if season_pref.preferred_foods and food.name.lower() in [f.lower() for f in season_pref.preferred_foods]:
-                score = 1.0
-                reasons.append(f"Perfect for {current_season} season")
-            elif season_pref.avoided_foods and food.name.lower() in [f.lower() for f in season_pref.avoided_foods]:
-                score = 0.2
-                reasons.append(f"Not ideal for {current_season} season")
+        if current_season in seasonal_food_sets:
+            preferred_foods, avoided_foods = seasonal_food_sets[current_season]
+            if preferred_foods or avoided_foods:
+                preferred = np.fromiter((name in preferred_foods for name in names_lower), dtype=bool, count=count)
+                avoided = np.fromiter((name in avoided_foods for name in names_lower), dtype=bool, count=count) & ~preferred
+                scores[preferred] = 1.0
+                scores[avoided] = 0.2
+                self._add_reason(reason_masks, preferred, REASON_SEASON_PREFERRED)
+                self._add_reason(reason_masks, avoided, REASON_SEASON_AVOIDED)
         
         # General seasonal appropriateness
-        if current_season == 'winter' and any(word in food.name.lower() for word in ['soup', 'stew', 'curry', 'hot']):
-            score = max(score, 0.8)
-            reasons.append("Warming food for winter")
-        elif current_season == 'summer' and any(word in food.name.lower() for word in ['salad', 'fresh', 'cold', 'smoothie']):
-            score = max(score, 0.8)
-            reasons.append("Refreshing food for summer")
-        
-        return score, reasons
+        if current_season in SEASONAL_PATTERNS:
+            seasonal_reason = SEASONAL_PATTERNS[current_season][1]
+            in_season = np.fromiter((current_season in classes for classes in name_classes), dtype=bool, count=count)
+            np.maximum(scores, 0.8, out=scores, where=in_season)
+            self._add_reason(reason_masks, in_season, seasonal_reason)
+        
+        return scores
     
-    def _calculate_social_score(self, food: FoodItem, user_profile: Dict) -> Tuple[float, List[str]]:
-        """Calculate social cooking alignment score"""
+    def _calculate_social_scores(self, features: Dict[str, np.ndarray], name_classes: List[frozenset], user_profile: Dict,
+                                 reason_masks: np.ndarray) -> np.ndarray:
+        """Calculate social cooking alignment scores"""
         
-        score = 0.5  # Default neutral score
-        reasons = []
+        count = len(name_classes)
+        scores = np.full(count, 0.5, dtype=np.float64)  # Default neutral score
         
         social_cooking = user_profile.get('social_cooking')
         
         if social_cooking:
             if social_cooking.cooking_for_others:
                 # Prefer foods that are good for sharing
-                if any(word in food.name.lower() for word in ['curry', 'pasta', 'casserole', 'stew']):
-                    score = 0.8
-                    reasons.append("Great for sharing with others")
+                shareable = np.fromiter(('sharing' in classes for classes in name_classes), dtype=bool, count=count)
+                scores[shareable] = 0.8
+                self._add_reason(reason_masks, shareable, REASON_SHAREABLE)
                 
                 # Consider family size
                 family_size = social_cooking.family_size or 1
-                if family_size > 2 and food.cost < 10:
-                    score += 0.2
-                    reasons.append("Economical for family meals")
+                if family_size > 2:
+                    economical = features['cost'] < 10
+                    np.add(scores, 0.2, out=scores, where=economical)
+                    self._add_reason(reason_masks, economical, REASON_FAMILY_ECONOMICAL)
         
-        return min(1.0, score), reasons
+        return np.minimum(scores, 1.0, out=scores)
     
-    def _calculate_meal_type_score(self, food: FoodItem, meal_type: str) -> Tuple[float, List[str]]:
-        """Calculate meal type appropriateness score"""
+    def _calculate_meal_type_scores(self, name_classes: List[frozenset], meal_type: str, reason_masks: np.ndarray) -> np.ndarray:
+        """Calculate meal type appropriateness scores"""
         
-        score = 0.5  # Default neutral score
-        reasons = []
+        count = len(name_classes)
+        scores = np.full(count, 0.5, dtype=np.float64)  # Default neutral score
         
-        food_name_lower = food.name.lower()
+        # Later categories override earlier ones, as each matching category sets the score
+        for category, _ in MEAL_TYPE_PATTERNS.get(meal_type, ()):
+            category_score, category_reason = MEAL_TYPE_CATEGORY_SCORES[category]
+            matches = np.fromiter(((meal_type, category) in classes for classes in name_classes), dtype=bool, count=count)
+            scores[matches] = category_score
+            self._add_reason(reason_masks, matches, category_reason)
         
-        appropriateness_map = {
-            'breakfast': {
-                'high': ['oats', 'eggs', 'yogurt', 'fruit', 'cereal', 'toast', 'pancake', 'smoothie'],
-                'medium': ['nuts', 'juice', 'cheese'],
-                'low': ['curry', 'fried rice', 'pizza', 'pasta']
-            },
-            'lunch': {
-                'high': ['salad', 'sandwich', 'soup', 'rice', 'quinoa', 'curry', 'stir fry'],
-                'medium': ['pasta', 'noodles', 'wrap'],
-                'low': ['dessert', 'cake', 'ice cream', 'cereal']
-            },
-            'dinner': {
-                'high': ['curry', 'stir fry', 'grilled', 'roasted', 'soup', 'pasta', 'rice'],
-                'medium': ['salad', 'sandwich'],
-                'low': ['cereal', 'toast', 'fruit', 'smoothie']
-            },
-            'snack': {
-                'high': ['nuts', 'fruit', 'yogurt', 'crackers', 'cheese'],
-                'medium': ['smoothie', 'juice'],
-                'low': ['curry', 'fried rice', 'pasta', 'heavy meal']
-            }
-        }
-        
-        meal_categories = appropriateness_map.get(meal_type, {})
-        
-        for category, keywords in meal_categories.items():
-            for keyword in keywords:
-                if keyword in food_name_lower:
-                    if category == 'high':
-                        score = 1.0
-                        reasons.append(f"Perfect for {meal_type}")
-                    elif category == 'medium':
-                        score = 0.6
-                        reasons.append(f"Good for {meal_type}")
-                    elif category == 'low':
-                        score = 0.2
-                        reasons.append(f"Not ideal for {meal_type}")
-                    break
-        
-        return score, reasons
+        return scores
     
     def _calculate_confidence_level(self, score: float, user_profile: Dict) -> str:
         """Calculate confidence level for recommendation"""
@@ -576,55 +807,31 @@ class EnhancedRecommendationRules:
         
         return query
     
-    def _get_recent_foods(self, user_id: int, days: int = 7) -> List[int]:
-        """Get recently consumed food IDs"""
-        
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        recent_meals = self.db.query(MealLog.food_item_id).filter(
-            and_(
-                MealLog.user_id == user_id,
-                MealLog.logged_at >= cutoff_date
-            )
-        ).distinct().all()
-        
-        return [meal[0] for meal in recent_meals]
-    
-    def _calculate_meal_regularity(self, meal_times: List[int]) -> float:
-        """Calculate meal timing regularity"""
+    def _calculate_meal_regularity(self, hour_counts: np.ndarray) -> float:
+        """Calculate meal timing regularity from the meals logged at each hour of the day"""
         
-        if not meal_times:
+        if not hour_counts.any():
             return 0.0
         
-        # Group by meal times
-        breakfast_hours = [h for h in meal_times if 6 <= h <= 10]
-        lunch_hours = [h for h in meal_times if 11 <= h <= 14]
-        dinner_hours = [h for h in meal_times if 17 <= h <= 21]
-        
-        # Calculate consistency for each meal type
-        breakfast_consistency = 1 - (len(set(breakfast_hours)) / max(len(breakfast_hours), 1)) if breakfast_hours else 0
-        lunch_consistency = 1 - (len(set(lunch_hours)) / max(len(lunch_hours), 1)) if lunch_hours else 0
-        dinner_consistency = 1 - (len(set(dinner_hours)) / max(len(dinner_hours), 1)) if dinner_hours else 0
+        # Consistency for each meal window: 1 - distinct hours / meals in the window
+        consistencies = []
+        for first_hour, last_hour in MEAL_HOUR_WINDOWS:
+            window_counts = hour_counts[first_hour:last_hour + 1]
+            window_meals = int(window_counts.sum())
+            consistencies.append(1 - np.count_nonzero(window_counts) / window_meals if window_meals else 0)
         
         # Overall regularity
-        return (breakfast_consistency + lunch_consistency + dinner_consistency) / 3
+        return sum(consistencies) / 3
     
     def _get_current_season(self) -> str:
         """Get current season based on date"""
-        month = datetime.now().month
-        if month in [12, 1, 2]:
-            return 'winter'
-        elif month in [3, 4, 5]:
-            return 'spring'
-        elif month in [6, 7, 8]:
-            return 'summer'
-        else:
-            return 'fall'
+        return SEASONS_BY_MONTH[datetime.now().month]
     
     def _get_default_patterns(self) -> Dict[str, Any]:
         """Get default patterns for new users"""
         return {
             'cuisine_preferences': {},
+            'recent_cuisines': frozenset(),
             'meal_timing_patterns': {
                 'breakfast_hours': [],
                 'lunch_hours': [],
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from agno.agent import Agent
 from app.models.groq_with_fallback import GroqWithFallback
@@ -81,7 +82,8 @@ class FitMentorService:
             Please create a detailed 7-day workout plan with specific exercises, durations, and progression tips."""
 
             logger.info(f"FitMentor prompt: {prompt}")
-            response = self.fitness_agent.run(prompt)
+            # Run the blocking agent call in a worker thread so the event loop keeps serving requests
+            response = await asyncio.to_thread(self.fitness_agent.run, prompt)
             logger.info(f"FitMentor raw response: {response}")
 
             # Extract content from RunOutput
@@ -198,7 +200,8 @@ class FitMentorService:
             Please provide an updated workout plan that addresses the feedback while maintaining progress."""
 
             logger.info(f"FitMentor adaptation prompt: {prompt}")
-            response = self.fitness_agent.run(prompt)
+            # Run the blocking agent call in a worker thread so the event loop keeps serving requests
+            response = await asyncio.to_thread(self.fitness_agent.run, prompt)
             logger.info(f"FitMentor adaptation response: {response}")
 
             # Extract content from RunOutput
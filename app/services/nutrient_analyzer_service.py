@@ -362,6 +362,9 @@ class NutrientAnalyzerService:
                 protein=parsed_nutrients["protein"],
                 carbs=parsed_nutrients["carbohydrates"],
                 fat=parsed_nutrients["fat"],
+                fiber_g=parsed_nutrients["fiber"],
+                sodium_mg=parsed_nutrients["sodium"],
+                sugar_g=parsed_nutrients["sugar"],
                 logged_at=datetime.utcnow(),
                 planned=False
             )
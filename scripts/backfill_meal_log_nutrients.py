@@ -0,0 +1,57 @@
+"""
+Backfill Meal Log Nutrients Script
+Adds the materialized fiber/sodium/sugar columns to meal_logs and populates them
+for meals that were logged before the values were stored at log time
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NUTRIENT_COLUMNS = {
+    "fiber_g": "fiber_g",
+    "sodium_mg": "sodium_mg",
+    "sugar_g": "sugar_g",
+}
+
+def add_missing_columns(conn):
+    """Add the nutrient columns to meal_logs if the table predates them"""
+    
+    existing = {col["name"] for col in inspect(conn).get_columns("meal_logs")}
+    for column in NUTRIENT_COLUMNS:
+        if column not in existing:
+            logger.info(f"Adding column meal_logs.{column}")
+            conn.execute(text(f"ALTER TABLE meal_logs ADD COLUMN {column} FLOAT DEFAULT 0"))
+
+def backfill_nutrients(conn):
+    """Populate nutrient columns from the logged food item and quantity"""
+    
+    for meal_column, food_column in NUTRIENT_COLUMNS.items():
+        result = conn.execute(text(f"""
+            UPDATE meal_logs
+            SET {meal_column} = COALESCE((
+                SELECT food_items.{food_column} FROM food_items
+                WHERE food_items.id = meal_logs.food_item_id
+            ), 0) * COALESCE(meal_logs.quantity, 1.0)
+            WHERE {meal_column} IS NULL OR {meal_column} = 0
+        """))
+        logger.info(f"Backfilled meal_logs.{meal_column} for {result.rowcount} rows")
+
+def main():
+    """Main backfill function"""
+    
+    with engine.begin() as conn:
+        add_missing_columns(conn)
+        backfill_nutrients(conn)
+    
+    logger.info("Meal log nutrient backfill complete!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Backfill Food Preference Counters Script
+Copies the context/seasonal counts that used to be stored as JSON on
+food_preference_learning into the food_preference_*_counters tables
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import Base, engine
+from app.models.enhanced_models import (
+    FoodPreferenceLearning, FoodPreferenceContextCounter, FoodPreferenceSeasonCounter
+)
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# JSON column -> (counter model, key column)
+COUNTER_SOURCES = {
+    "context_preferences": (FoodPreferenceContextCounter, "context_key"),
+    "seasonal_preferences": (FoodPreferenceSeasonCounter, "season"),
+}
+
+def backfill_counters(db: Session):
+    """Add each legacy JSON count onto the matching counter row"""
+    
+    for json_column, (model, key_column) in COUNTER_SOURCES.items():
+        existing = {
+            (row.user_id, row.food_item_id, getattr(row, key_column)): row
+            for row in db.query(model).all()
+        }
+        
+        records = db.execute(
+            select(
+                FoodPreferenceLearning.user_id,
+                FoodPreferenceLearning.food_item_id,
+                getattr(FoodPreferenceLearning, json_column)
+            ).where(getattr(FoodPreferenceLearning, json_column).isnot(None))
+        ).all()
+        
+        migrated = 0
+        for user_id, food_item_id, counts in records:
+            for key, count in (counts or {}).items():
+                counter = existing.get((user_id, food_item_id, key))
+                if counter:
+                    counter.count = (counter.count or 0) + int(count)
+                else:
+                    counter = model(user_id=user_id, food_item_id=food_item_id, count=int(count))
+                    setattr(counter, key_column, key)
+                    db.add(counter)
+                    existing[(user_id, food_item_id, key)] = counter
+                migrated += 1
+        
+        # Clear the legacy blobs so a rerun does not count them twice
+        db.query(FoodPreferenceLearning).filter(
+            getattr(FoodPreferenceLearning, json_column).isnot(None)
+        ).update({json_column: {}}, synchronize_session=False)
+        
+        logger.info(f"Migrated {migrated} {json_column} counts into {model.__tablename__}")
+
+def main():
+    """Main backfill function"""
+    
+    Base.metadata.create_all(
+        bind=engine, tables=[FoodPreferenceContextCounter.__table__, FoodPreferenceSeasonCounter.__table__]
+    )
+    
+    with Session(engine) as db:
+        backfill_counters(db)
+        db.commit()
+    
+    logger.info("Food preference counter backfill complete!")
+
+if __name__ == "__main__":
+    main()
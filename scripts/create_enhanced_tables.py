@@ -11,6 +11,7 @@ from app.database import Base, engine
 from app.models.enhanced_models import (
     UserBehavior, FoodRating, RecipeInteraction, UserCookingPattern,
     MealPlanAdherence, UserNutritionGoals, FoodPreferenceLearning,
+    FoodPreferenceContextCounter, FoodPreferenceSeasonCounter,
     ChatbotInteraction, SeasonalPreference, SocialCookingData
 )
 
@@ -31,6 +32,8 @@ def create_enhanced_tables():
         print("   - meal_plan_adherence")
         print("   - user_nutrition_goals")
         print("   - food_preference_learning")
+        print("   - food_preference_context_counters")
+        print("   - food_preference_season_counters")
         print("   - chatbot_interactions")
         print("   - seasonal_preferences")
         print("   - social_cooking_data")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Script to create the composite indexes declared on the models for existing databases
+(Base.metadata.create_all only creates indexes together with new tables)
+
+Unique indexes cannot be created while duplicate rows exist. By default the duplicates are
+reported and nothing is changed; pass --dedupe to merge them into one row per key first.
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import and_, delete, func, inspect, select, update
+
+from app.database import Base, engine
+import app.models.enhanced_models  # noqa: F401 - registers enhanced tables on Base
+import app.models.enhanced_challenge_models  # noqa: F401
+
+# How --dedupe merges the rows sharing a unique key: the most recent row (by "recency", then id)
+# survives with its settings, "sum" columns are added up across the rows and "weighted" columns
+# become the average of the rows weighted by the given count column
+DEDUPE_RULES = {
+    "user_cooking_patterns": {"recency": "last_updated"},
+    "social_cooking_data": {"recency": "last_updated"},
+    "food_preference_learning": {
+        "recency": "last_interaction",
+        "sum": ("interaction_count",),
+        "weighted": {"preference_score": "interaction_count"}
+    },
+    "food_preference_context_counters": {"recency": "id", "sum": ("count",)},
+    "food_preference_season_counters": {"recency": "id", "sum": ("count",)}
+}
+
+def find_duplicates(connection, table, index):
+    """Return the (non-null) unique keys shared by more than one row, with their row counts"""
+    
+    columns = [table.c[column.name] for column in index.columns]
+    return connection.execute(
+        select(*columns, func.count())
+        .where(and_(*(column.isnot(None) for column in columns)))
+        .group_by(*columns)
+        .having(func.count() > 1)
+    ).all()
+
+def merge_duplicates(connection, table, index, duplicates):
+    """Merge each group of duplicate rows into its most recent row"""
+    
+    rules = DEDUPE_RULES[table.name]
+    recency = table.c[rules["recency"]]
+    columns = [table.c[column.name] for column in index.columns]
+    
+    removed = 0
+    for *key, _ in duplicates:
+        rows = connection.execute(
+            select(table)
+            .where(and_(*(column == value for column, value in zip(columns, key))))
+            .order_by(recency.desc().nulls_last(), table.c.id.desc())
+        ).mappings().all()
+        survivor, others = rows[0], rows[1:]
+    
+        values = {column: sum(row[column] or 0 for row in rows) for column in rules.get("sum", ())}
+        for column, weight in rules.get("weighted", {}).items():
+            total_weight = sum(row[weight] or 0 for row in rows)
+            if total_weight:
+                values[column] = sum((row[column] or 0) * (row[weight] or 0) for row in rows) / total_weight
+        if values:
+            connection.execute(update(table).where(table.c.id == survivor["id"]).values(**values))
+    
+        connection.execute(delete(table).where(table.c.id.in_([row["id"] for row in others])))
+        removed += len(others)
+    
+    print(f"   - merged {removed} duplicate rows into {len(duplicates)} rows in {table.name}")
+
+def create_indexes(dedupe: bool = False):
+    """Create any declared index that does not exist yet"""
+    
+    print("Creating missing indexes...")
+    
+    try:
+        inspector = inspect(engine)
+        missing = []
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            missing.extend((table, index) for index in table.indexes if index.name not in existing)
+    
+        # Find the duplicate rows that would make a unique index fail
+        blocked = []
+        with engine.connect() as connection:
+            for table, index in missing:
+                if not index.unique:
+                    continue
+                duplicates = find_duplicates(connection, table, index)
+                if duplicates:
+                    rows = sum(count for *_, count in duplicates)
+                    print(f"   ! {table.name}.{index.name}: {len(duplicates)} keys are shared by {rows} rows")
+                    blocked.append((table, index, duplicates))
+    
+        if blocked:
+            if not dedupe:
+                print("❌ Duplicate rows block the unique indexes above; re-run with --dedupe to merge them")
+                return False
+            unsupported = [table.name for table, _, _ in blocked if table.name not in DEDUPE_RULES]
+            if unsupported:
+                print(f"❌ No merge rule for {', '.join(unsupported)}; resolve those duplicates manually")
+                return False
+            with engine.begin() as connection:
+                for table, index, duplicates in blocked:
+                    merge_duplicates(connection, table, index, duplicates)
+    
+        for table, index in missing:
+            index.create(bind=engine)
+            print(f"   - {table.name}.{index.name}")
+    
+        print("✅ Indexes are up to date")
+    
+    except Exception as e:
+        print(f"❌ Error creating indexes: {e}")
+        return False
+    
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dedupe", action="store_true",
+                        help="merge rows that share a unique key (sum counts, keep the latest settings)")
+    args = parser.parse_args()
+    sys.exit(0 if create_indexes(dedupe=args.dedupe) else 1)